@@ -0,0 +1,111 @@
+"""
+Semantic Answer Cache Module
+
+This module caches generated answers keyed by the embedding of the question, so
+rephrasings of an already answered question can be replayed without running the
+agent again.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from embeddings import EmbeddingService, normalize_text
+
+# Configuration
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+
+@dataclass
+class CachedAnswer:
+    """A cached answer together with the embedding of its question."""
+
+    question: str
+    answer: str
+    vector: np.ndarray
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """In-memory LRU cache of answers looked up by cosine similarity."""
+
+    def __init__(
+        self,
+        embedder: EmbeddingService,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: int = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: OrderedDict[str, CachedAnswer] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _evict_expired(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, v in self._entries.items() if v.created_at < cutoff]:
+            del self._entries[key]
+
+    async def lookup(self, question: str) -> Optional[CachedAnswer]:
+        """Return the closest cached answer if it is similar enough to the question."""
+        if not self.enabled:
+            return None
+
+        self._evict_expired()
+        if not self._entries:
+            return None
+
+        vector = await self.embedder.embed_dense_query(question)
+        keys = list(self._entries.keys())
+        matrix = np.stack([self._entries[key].vector for key in keys])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+
+        if scores[best] < self.threshold:
+            return None
+
+        # Entries may have been evicted while the question was being embedded
+        entry = self._entries.get(keys[best])
+        if entry is not None:
+            self._entries.move_to_end(keys[best])
+        return entry
+
+    async def store(self, question: str, answer: str, generation: int) -> None:
+        """Cache an answer unless the cache was invalidated since `generation`."""
+        if not self.enabled or generation != self.generation:
+            return
+
+        vector = await self.embedder.embed_dense_query(question)
+        if generation != self.generation:
+            return
+
+        key = normalize_text(question)
+        self._entries[key] = CachedAnswer(
+            question=question,
+            answer=answer,
+            vector=vector,
+            created_at=time.monotonic(),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drop every cached answer, e.g. after the knowledge base was rebuilt."""
+        self._entries.clear()
+        self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
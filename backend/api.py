@@ -2,7 +2,7 @@
 D&D Knowledge Base - FastAPI Server
 
 This module provides the FastAPI server implementation for the D&D knowledge base,
-offering endpoints to ask questions and generate the vector database.
+offering endpoints to ask questions and generate the vector database in the background.
 
 Example usage:
 
@@ -11,49 +11,73 @@ curl -X POST http://localhost:8000/ask/stream \
   -d '{"question": "Describe the spell Fireball in D&D 5e."}'
 
 curl -X POST http://localhost:8000/generate_database
+curl http://localhost:8000/generate_database/<job_id>
+curl -X POST http://localhost:8000/collection/rollback
 """
 
+import asyncio
 import os
+import time
 import logfire
 import uvicorn
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from qdrant_client import QdrantClient
-from docling.chunking import HybridChunker
-from docling.datamodel.base_models import InputFormat
-from docling.document_converter import DocumentConverter
-
-from main import (
-    DndKnowledgeBase,
-    QDRANT_URL,
-    COLLECTION_NAME,
-    EMBEDDING_MODEL,
-    SPARSE_MODEL,
+from main import COLLECTION_NAME, Deps, DndKnowledgeBase
+from answer_cache import SemanticAnswerCache
+from auth import auth, get_user_context, UserContext
+from chat_history import MESSAGE_PAGE_SIZE, SESSION_PAGE_SIZE, chat_history_manager
+from chat_persistence import ChatWriteBehind
+from conversation_memory import ConversationMemory
+from readiness import Readiness
+from web_search import SearchResult
+from collection_versions import CollectionVersionError
+from ingestion import (
+    IngestionAlreadyRunning,
+    IngestionJob,
+    describe_collection_versions,
+    index_profile_of,
+    ingestion_manager,
+    rollback_collection,
 )
-from auth import get_user_context, UserContext
-from chat_history import chat_history_manager
 
 # Configuration
-DND_HANDBOOK_URL = os.getenv(
-    "DND_HANDBOOK_URL",
-    "https://media.wizards.com/2014/downloads/dnd/PlayerDnDBasicRules_v0.2_PrintFriendly.pdf",
-)
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
+# Run web search and retrieval before the agent instead of as tool calls
+EAGER_MODE = os.getenv("EAGER_MODE", "false").lower() == "true"
 
+# Without a token, traces are not sent anywhere (local runs and load tests)
 logfire.configure(
-    token=os.environ["LOGFIRE_TOKEN"],
+    token=os.getenv("LOGFIRE_TOKEN"),
+    send_to_logfire="if-token-present",
 )
 logfire.configure(scrubbing=False)
 logfire.instrument_pydantic_ai()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the services, then warm up their dependencies in the background."""
+    build_services()
+    register_warmups()
+    warmup_task = asyncio.create_task(readiness.run())
+    yield
+    warmup_task.cancel()
+    await asyncio.gather(warmup_task, return_exceptions=True)
+    await ingestion_manager.shutdown()
+    await conversation_memory.shutdown()
+    await chat_writer.close()
+    await kb.shutdown()
+
+
 app = FastAPI(
     title="D&D Knowledge Base API",
     description="API for answering Dungeons & Dragons 5th Edition questions",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware for frontend authentication
@@ -65,15 +89,97 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-kb = DndKnowledgeBase()
-main_agent = kb.get_main_agent()
-intents_agent = kb.get_intents_agent()
-deps = kb.get_deps()
+chat_writer = ChatWriteBehind(chat_history_manager)
+readiness = Readiness()
+
+# Built by build_services when the server starts
+kb: Optional[DndKnowledgeBase] = None
+main_agent = None
+intent_classifier = None
+answer_agent = None
+deps: Optional[Deps] = None
+answer_cache: Optional[SemanticAnswerCache] = None
+conversation_memory: Optional[ConversationMemory] = None
+# Collection version the alias pointed at when last checked
+live_version: Optional[str] = None
+# Any job may have changed the live version, even one that failed after the swap
+ingestion_manager.on_finished.append(lambda job: follow_live_collection())
+
+# Size of the pieces a cached answer is replayed in
+CACHED_ANSWER_CHUNK_SIZE = 64
+CANCELLED_MARKER = "\n🛑 Response cancelled by user"
+WARMUP_QUERY = "How does a Fireball work?"
+
+
+def build_services() -> None:
+    """
+    Load the models and build the knowledge base and everything using it.
+    Later calls are no-ops.
+    """
+    global kb, main_agent, intent_classifier, answer_agent, deps
+    global answer_cache, conversation_memory
+    if kb is not None:
+        return
+
+    started = time.perf_counter()
+    kb = DndKnowledgeBase()
+    main_agent = kb.get_main_agent()
+    intent_classifier = kb.get_intent_classifier()
+    answer_agent = kb.get_answer_agent()
+    deps = kb.get_deps()
+    answer_cache = SemanticAnswerCache(kb.qdrant_service.embedder)
+    conversation_memory = ConversationMemory(
+        chat_history_manager, kb.get_summary_agent()
+    )
+    readiness.record("knowledge_base", (time.perf_counter() - started) * 1000)
+
+
+async def follow_live_collection() -> None:
+    """
+    Search with the index profile of the version the alias points at, and drop
+    cached answers whenever that version changed, however it changed.
+    """
+    global live_version
+    qdrant_service = kb.qdrant_service
+    live = await qdrant_service.live_collection(COLLECTION_NAME)
+    qdrant_service.use_profile(await asyncio.to_thread(index_profile_of, live))
+    if live != live_version:
+        # Cached answers came from the version that was replaced
+        answer_cache.invalidate()
+        live_version = live
+
+
+def register_warmups() -> None:
+    """Warm every dependency up with the kind of request users will send."""
+    embedder = kb.qdrant_service.embedder
+
+    async def warm_embeddings() -> None:
+        await embedder.embed_query(WARMUP_QUERY)
+        await embedder.rerank(WARMUP_QUERY, [WARMUP_QUERY])
+
+    async def warm_qdrant() -> None:
+        qdrant_service = kb.qdrant_service
+        await follow_live_collection()
+        # Before the first ingestion there is nothing to query yet
+        if live_version or await qdrant_service.client.collection_exists(
+            COLLECTION_NAME
+        ):
+            await qdrant_service.search(COLLECTION_NAME, WARMUP_QUERY, limit=1)
+
+    readiness.add("embeddings", warm_embeddings)
+    readiness.add("qdrant", warm_qdrant)
+    readiness.add("mongodb", chat_history_manager.connect)
+    readiness.add("keycloak", auth.jwks.refresh)
+    readiness.add("llm", kb.agent_factory.preload)
+    # Both degrade gracefully: web search fails soft and intent checks fall back
+    readiness.add("browser_pool", kb.startup, required=False)
+    readiness.add("intent_classifier", intent_classifier.warmup, required=False)
 
 
 class QuestionRequest(BaseModel):
     question: str
     session_id: Optional[str] = None
+    eager: Optional[bool] = None
 
 
 class ChatSessionResponse(BaseModel):
@@ -84,6 +190,26 @@ class ChatSessionResponse(BaseModel):
     updated_at: str
 
 
+class ChatSessionSummaryResponse(BaseModel):
+    id: str
+    title: str
+    message_count: int
+    last_message_preview: str
+    created_at: str
+    updated_at: str
+
+
+class ChatSessionListResponse(BaseModel):
+    sessions: List[ChatSessionSummaryResponse]
+    next_cursor: Optional[str]
+
+
+class ChatMessagesResponse(BaseModel):
+    messages: List[dict]
+    total: int
+    next_before: Optional[int]
+
+
 class CreateSessionRequest(BaseModel):
     title: str = ""
 
@@ -92,9 +218,32 @@ class UpdateSessionRequest(BaseModel):
     title: str
 
 
-class DatabaseGenerationResponse(BaseModel):
+class IngestionJobResponse(BaseModel):
+    id: str
     status: str
+    phase: str
+    sources_total: int
+    sources_unchanged: int
+    pages_converted: int
+    chunks_embedded: int
+    points_upserted: int
+    points_copied: int
+    points_deleted: int
     document_count: int
+    collection: Optional[str]
+    error: Optional[str]
+    created_at: str
+    finished_at: Optional[str]
+
+
+class RollbackRequest(BaseModel):
+    version: Optional[int] = None
+
+
+class CollectionVersionsResponse(BaseModel):
+    alias: str
+    current: Optional[str]
+    versions: List[str]
 
 
 class UserProfileResponse(BaseModel):
@@ -105,11 +254,6 @@ class UserProfileResponse(BaseModel):
     roles: list
 
 
-class SavePartialResponseRequest(BaseModel):
-    session_id: str
-    partial_response: str
-
-
 @app.get("/profile")
 async def get_user_profile(
     user_context: UserContext = Depends(get_user_context),
@@ -126,21 +270,32 @@ async def get_user_profile(
 
 @app.get("/chat/sessions")
 async def get_chat_sessions(
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = None,
     user_context: UserContext = Depends(get_user_context),
-) -> List[ChatSessionResponse]:
-    """Get all chat sessions for the current user."""
-    sessions = await chat_history_manager.get_user_chat_sessions(user_context.user_id)
-
-    return [
-        ChatSessionResponse(
-            id=session.id,
-            title=session.title,
-            messages=[msg.model_dump() for msg in session.messages],
-            created_at=session.created_at.isoformat(),
-            updated_at=session.updated_at.isoformat(),
+) -> ChatSessionListResponse:
+    """List the current user's chat sessions, most recent first, one page at a time."""
+    try:
+        sessions, next_cursor = await chat_history_manager.list_session_summaries(
+            user_context.user_id, limit=limit, cursor=cursor
         )
-        for session in sessions
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ChatSessionListResponse(
+        sessions=[
+            ChatSessionSummaryResponse(
+                id=session.id,
+                title=session.title,
+                message_count=session.message_count,
+                last_message_preview=session.last_message_preview,
+                created_at=session.created_at.isoformat(),
+                updated_at=session.updated_at.isoformat(),
+            )
+            for session in sessions
+        ],
+        next_cursor=next_cursor,
+    )
 
 
 @app.post("/chat/sessions")
@@ -182,6 +337,28 @@ async def get_chat_session(
     )
 
 
+@app.get("/chat/sessions/{session_id}/messages")
+async def get_chat_session_messages(
+    session_id: str,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=200),
+    before: Optional[int] = Query(None, ge=1),
+    user_context: UserContext = Depends(get_user_context),
+) -> ChatMessagesResponse:
+    """Get a page of a chat session's messages, the most recent ones by default."""
+    page = await chat_history_manager.get_session_messages(
+        session_id, user_context.user_id, limit=limit, before=before
+    )
+
+    if not page:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+
+    return ChatMessagesResponse(
+        messages=[msg.model_dump() for msg in page.messages],
+        total=page.total,
+        next_before=page.next_before,
+    )
+
+
 @app.put("/chat/sessions/{session_id}")
 async def update_chat_session(
     session_id: str,
@@ -214,165 +391,323 @@ async def delete_chat_session(
     return {"message": "Session deleted successfully"}
 
 
+async def stream_agent_text(agent, prompt: str, run_deps: Deps, message_history: list):
+    """Run an agent and yield the text deltas of its model responses."""
+    async with agent.iter(
+        prompt, deps=run_deps, message_history=message_history
+    ) as run:
+        async for node in run:
+            if agent.is_model_request_node(node):
+                async with node.stream(run.ctx) as request_stream:
+                    async for event in request_stream:
+                        if hasattr(event, "delta") and hasattr(
+                            event.delta, "content_delta"
+                        ):
+                            yield event.delta.content_delta
+
+
+def start_speculative(coro) -> asyncio.Task:
+    """Start a stage that may never be awaited if an earlier check fails."""
+    task = asyncio.create_task(coro)
+    # Retrieve the outcome so abandoned tasks don't log unretrieved exceptions
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+
+def cancel_tasks(*tasks: asyncio.Task) -> None:
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+
+
 @app.post("/ask/stream")
 async def ask_question_stream(
     request: QuestionRequest, user_context: UserContext = Depends(get_user_context)
 ) -> StreamingResponse:
     """Ask a D&D question with authentication required and save to chat history."""
-    is_related = await intents_agent.run(request.question)
+    started_at = time.perf_counter()
+    eager = EAGER_MODE if request.eager is None else request.eager
+    cache_generation = answer_cache.generation
+
+    # Start every independent stage at once; the answer is only released once
+    # the intent check passed and everything else is cancelled if it fails
+    history_task = start_speculative(
+        conversation_memory.load(request.session_id, user_context.user_id)
+    )
+    cache_task = start_speculative(answer_cache.lookup(request.question))
+    intent_task = start_speculative(intent_classifier.classify(request.question))
+    prefetch_task = start_speculative(kb.prefetch_context(request.question))
+
+    async def search_web_if_related() -> List[SearchResult]:
+        # Searching and crawling costs far more than retrieval, so it only
+        # starts once the question is known to be about D&D
+        if not (await intent_task).is_related:
+            return []
+        return await kb.search_web(request.question)
+
+    web_task = start_speculative(search_web_if_related()) if eager else None
+    speculative_tasks = tuple(
+        task
+        for task in (history_task, cache_task, intent_task, prefetch_task, web_task)
+        if task is not None
+    )
 
-    if not is_related.output:
+    try:
+        message_history = await history_task
 
-        async def error_generator():
-            yield "Sorry, I can only answer questions related to Dungeons and Dragons 5th Edition."
+        # Only standalone questions are answered from the cache, follow-ups
+        # depend on the conversation they belong to
+        cached_answer = None
+        if message_history:
+            cancel_tasks(cache_task)
+        else:
+            cached_answer = await cache_task
 
-        return StreamingResponse(error_generator(), media_type="text/plain")
+        if cached_answer is None:
+            intent = await intent_task
 
-    # Get chat history for context if session_id is provided
-    message_history = []
-    if request.session_id:
-        session = await chat_history_manager.get_chat_session(
-            request.session_id, user_context.user_id
-        )
-        if session:
-            # Import Pydantic AI message types at runtime
-            from pydantic_ai.messages import (
-                ModelRequest,
-                ModelResponse,
-                UserPromptPart,
-                TextPart,
+            if not intent.is_related:
+                cancel_tasks(*speculative_tasks)
+
+                async def error_generator():
+                    yield "Sorry, I can only answer questions related to Dungeons and Dragons 5th Edition."
+
+                return StreamingResponse(error_generator(), media_type="text/plain")
+        else:
+            cancel_tasks(*speculative_tasks)
+
+        if request.session_id:
+            # Add the current question to history
+            await chat_writer.append(
+                request.session_id, user_context.user_id, request.question, is_user=True
             )
+    except BaseException:
+        cancel_tasks(*speculative_tasks)
+        raise
 
-            # Convert MongoDB messages to Pydantic AI message format
-            for msg in session.messages:
-                if msg.is_user:
-                    message_history.append(
-                        ModelRequest(parts=[UserPromptPart(content=msg.content)])
-                    )
-                else:
-                    message_history.append(
-                        ModelResponse(parts=[TextPart(content=msg.content)])
-                    )
+    if cached_answer is not None:
 
-        # Add the current question to history
-        await chat_history_manager.add_message_to_session(
-            request.session_id, user_context.user_id, request.question, is_user=True
+        async def cached_response():
+            answer = cached_answer.answer
+            for start in range(0, len(answer), CACHED_ANSWER_CHUNK_SIZE):
+                yield answer[start : start + CACHED_ANSWER_CHUNK_SIZE]
+
+            if request.session_id:
+                await chat_writer.append(
+                    request.session_id, user_context.user_id, answer, is_user=False
+                )
+
+        return StreamingResponse(cached_response(), media_type="text/plain")
+
+    answer_message = None
+    if request.session_id:
+        answer_message = await chat_writer.open_message(
+            request.session_id, user_context.user_id, is_user=False
         )
 
     async def stream_response():
         response_content = ""
         try:
-            async with main_agent.iter(
-                request.question, deps=deps, message_history=message_history
-            ) as run:
-                async for node in run:
-                    if main_agent.is_model_request_node(node):
-                        async with node.stream(run.ctx) as request_stream:
-                            async for event in request_stream:
-                                if hasattr(event, "delta") and hasattr(
-                                    event.delta, "content_delta"
-                                ):
-                                    content_delta = event.delta.content_delta
-                                    response_content += content_delta
-                                    yield content_delta
+            rulebook_context = await prefetch_task
+            web_results = await web_task if web_task else []
+            if eager and (web_results or rulebook_context):
+                agent, mode = answer_agent, "eager"
+                prompt = kb.build_eager_prompt(
+                    request.question, web_results, rulebook_context
+                )
+            else:
+                # Tools mode, and eager mode when nothing was found. The
+                # rulebook context retrieved for the question goes into the
+                # prompt, so the agent starts out with it
+                agent, mode = main_agent, "tools"
+                prompt = kb.build_tools_prompt(request.question, rulebook_context)
+            run_deps = Deps(client=deps.client)
+
+            async for content_delta in stream_agent_text(
+                agent, prompt, run_deps, message_history
+            ):
+                if content_delta and not response_content:
+                    logfire.info(
+                        "first token streamed",
+                        mode=mode,
+                        ttft_ms=(time.perf_counter() - started_at) * 1000,
+                    )
+                response_content += content_delta
+                if answer_message:
+                    answer_message.update(response_content)
+                yield content_delta
 
             # Save complete response on successful completion
-            if request.session_id and response_content:
-                await chat_history_manager.add_message_to_session(
-                    request.session_id,
-                    user_context.user_id,
-                    response_content,
-                    is_user=False,
+            if answer_message and response_content:
+                answer_message.finish(response_content)
+            if not message_history and response_content:
+                await answer_cache.store(
+                    request.question, response_content, cache_generation
                 )
         except Exception as e:
             # Save partial response with error indicator when an error occurs
-            if request.session_id and response_content:
+            if answer_message and response_content:
                 error_message = (
                     f"\n\n❌ Error occurred during response generation: {str(e)}"
                 )
-                await chat_history_manager.add_message_to_session(
-                    request.session_id,
-                    user_context.user_id,
-                    response_content + error_message,
-                    is_user=False,
-                )
+                answer_message.finish(response_content + error_message)
             # Yield the error message to the stream
             yield f"\n\n❌ Error occurred: {str(e)}"
+        finally:
+            # Still open when the client disconnected mid-stream
+            if answer_message and not answer_message.finished and response_content:
+                answer_message.finish(response_content + CANCELLED_MARKER)
+            cancel_tasks(*speculative_tasks)
 
     return StreamingResponse(stream_response(), media_type="text/plain")
 
 
-@app.post("/chat/save_partial")
-async def save_partial_response(
-    request: SavePartialResponseRequest,
-    user_context: UserContext = Depends(get_user_context),
-) -> dict:
-    """Save a partial response when a stream is cancelled."""
-    if not request.session_id or not request.partial_response:
+def require_admin(user_context: UserContext) -> None:
+    if not user_context.has_role("admin"):
         raise HTTPException(
-            status_code=400, detail="Session ID and partial response are required"
+            status_code=403,
+            detail="Access denied. Admin role required to generate database.",
         )
 
-    success = await chat_history_manager.add_message_to_session(
-        request.session_id,
-        user_context.user_id,
-        request.partial_response + "\n🛑 Response cancelled by user",
-        is_user=False,
-    )
-
-    if not success:
-        raise HTTPException(status_code=404, detail="Chat session not found")
 
-    return {"message": "Partial response saved successfully"}
+def job_response(job: IngestionJob) -> IngestionJobResponse:
+    return IngestionJobResponse(
+        id=job.id,
+        status=job.status,
+        phase=job.phase,
+        sources_total=job.sources_total,
+        sources_unchanged=job.sources_unchanged,
+        pages_converted=job.pages_converted,
+        chunks_embedded=job.chunks_embedded,
+        points_upserted=job.points_upserted,
+        points_copied=job.points_copied,
+        points_deleted=job.points_deleted,
+        document_count=job.document_count,
+        collection=job.collection,
+        error=job.error,
+        created_at=job.created_at.isoformat(),
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
+    )
 
 
-@app.post("/generate_database")
+@app.post("/generate_database", status_code=202)
 async def generate_database(
     user_context: UserContext = Depends(get_user_context),
-) -> DatabaseGenerationResponse:
-    """Generate the D&D knowledge database. Requires authentication and admin role."""
+) -> IngestionJobResponse:
+    """Start generating the D&D knowledge database in the background. Requires admin role."""
+    require_admin(user_context)
 
-    # Check if user has admin role
-    if not user_context.has_role("admin"):
+    try:
+        job = ingestion_manager.start()
+    except IngestionAlreadyRunning as e:
         raise HTTPException(
-            status_code=403,
-            detail="Access denied. Admin role required to generate database.",
+            status_code=409, detail=f"Database generation already running: {e}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to start database generation: {str(e)}"
         )
 
+    return job_response(job)
+
+
+@app.get("/generate_database/{job_id}")
+async def get_database_generation(
+    job_id: str, user_context: UserContext = Depends(get_user_context)
+) -> IngestionJobResponse:
+    """Get the status and progress of a database generation job."""
+    require_admin(user_context)
+
+    job = ingestion_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_response(job)
+
+
+@app.delete("/generate_database/{job_id}")
+async def cancel_database_generation(
+    job_id: str, user_context: UserContext = Depends(get_user_context)
+) -> IngestionJobResponse:
+    """Cancel a running database generation job."""
+    require_admin(user_context)
+
+    job = await ingestion_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job_response(job)
+
+
+@app.get("/collection/versions")
+async def get_collection_versions(
+    user_context: UserContext = Depends(get_user_context),
+) -> CollectionVersionsResponse:
+    """List the live collection version and the versions available for rollback."""
+    require_admin(user_context)
+
     try:
-        doc_converter = DocumentConverter(allowed_formats=[InputFormat.PDF])
-        db_client = QdrantClient(location=QDRANT_URL)
-        db_client.set_model(EMBEDDING_MODEL)
-        db_client.set_sparse_model(SPARSE_MODEL)
-
-        result = doc_converter.convert(DND_HANDBOOK_URL)
-
-        documents, metadatas = [], []
-        for chunk in HybridChunker().chunk(result.document):
-            documents.append(chunk.text)
-            metadatas.append(chunk.meta.export_json_dict())
-
-        db_client.add(
-            collection_name=COLLECTION_NAME,
-            documents=documents,
-            metadata=metadatas,
-            batch_size=BATCH_SIZE,
+        versions = await asyncio.to_thread(describe_collection_versions)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to list collection versions: {str(e)}"
         )
 
-        return DatabaseGenerationResponse(
-            status="success", document_count=len(documents)
+    return CollectionVersionsResponse(**versions)
+
+
+@app.post("/collection/rollback")
+async def rollback_collection_version(
+    request: Optional[RollbackRequest] = None,
+    user_context: UserContext = Depends(get_user_context),
+) -> CollectionVersionsResponse:
+    """Point the knowledge base back at an older version. Requires admin role."""
+    require_admin(user_context)
+
+    if ingestion_manager.active_job is not None:
+        raise HTTPException(
+            status_code=409, detail="Cannot roll back while database generation runs"
         )
 
+    try:
+        version = request.version if request else None
+        await asyncio.to_thread(rollback_collection, version)
+    except CollectionVersionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(
-            status_code=500, detail=f"Failed to generate database: {str(e)}"
+            status_code=500, detail=f"Failed to roll back collection: {str(e)}"
         )
 
+    await follow_live_collection()
+    versions = await asyncio.to_thread(describe_collection_versions)
+    return CollectionVersionsResponse(**versions)
+
 
 @app.get("/health")
 async def health_check() -> dict:
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check() -> JSONResponse:
+    """Report readiness and warmup timings per component, 503 until ready."""
+    return JSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
+
+@app.get("/stats")
+async def get_stats() -> dict:
+    """Report cache statistics of the retrieval path."""
+    return {
+        "query_vector_cache": kb.qdrant_service.vector_cache.stats(),
+        "answer_cache": {"entries": len(answer_cache)},
+        "conversation_memory": conversation_memory.stats(),
+        "chat_writes": chat_writer.stats(),
+        "auth": auth.stats(),
+        "crawler_pool": kb.crawler_pool.stats(),
+        "web_cache": kb.web_tool.cache.stats(),
+    }
+
+
 if __name__ == "__main__":
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
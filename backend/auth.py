@@ -1,13 +1,22 @@
 """
 Authentication module for D&D RAG application using Keycloak.
+
+Tokens are verified against the realm's JSON Web Key Set, fetched
+asynchronously and refreshed when a token names an unknown key, so Keycloak key
+rotation needs no restart. Verified tokens are remembered by their SHA-256
+digest until they expire, so repeated requests with the same token cost a
+dictionary lookup.
 """
 
+import asyncio
+import hashlib
 import os
+import time
 import jwt
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from keycloak import KeycloakOpenID
 import httpx
 
 # Configuration
@@ -15,21 +24,153 @@ KEYCLOAK_URL = os.getenv("KEYCLOAK_URL", "http://localhost:8080")
 KEYCLOAK_REALM = os.getenv("KEYCLOAK_REALM", "dnd-rag")
 KEYCLOAK_CLIENT_ID = os.getenv("KEYCLOAK_CLIENT_ID", "dnd-rag-backend")
 KEYCLOAK_CLIENT_SECRET = os.getenv("KEYCLOAK_CLIENT_SECRET", "your-client-secret")
-
-# Initialize Keycloak
-keycloak_openid = KeycloakOpenID(
-    server_url=KEYCLOAK_URL,
-    client_id=KEYCLOAK_CLIENT_ID,
-    realm_name=KEYCLOAK_REALM,
-    client_secret_key=KEYCLOAK_CLIENT_SECRET,
+KEYCLOAK_JWKS_URL = os.getenv(
+    "KEYCLOAK_JWKS_URL",
+    f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs",
 )
+# Minimum seconds between two key set fetch attempts, failed ones included
+JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "30"))
+# Keys older than this are refetched, so removed keys stop being trusted
+JWKS_MAX_AGE = float(os.getenv("JWKS_MAX_AGE", "3600"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 security = HTTPBearer()
 
 
+class KeycloakUnavailable(Exception):
+    """Raised when the key set cannot be fetched and no usable key is cached."""
+
+
+class JWKSFetcher:
+    """Signing keys of the realm by key id, fetched without blocking the event loop."""
+
+    def __init__(
+        self,
+        url: str = KEYCLOAK_JWKS_URL,
+        refresh_interval: float = JWKS_REFRESH_INTERVAL,
+        max_age: float = JWKS_MAX_AGE,
+    ):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.keys: Dict[str, jwt.PyJWK] = {}
+        self.fetched_at: Optional[float] = None
+        # Start of the last fetch, successful or not
+        self.last_attempt: Optional[float] = None
+        self.fetches = 0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> None:
+        """Fetch the key set and keep its signing keys."""
+        self.last_attempt = time.monotonic()
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+            jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        except Exception as e:
+            raise KeycloakUnavailable(f"Could not fetch Keycloak keys: {e}") from e
+
+        self.keys = {
+            key.key_id: key
+            for key in jwk_set.keys
+            if key.key_id and key.public_key_use in ("sig", None)
+        }
+        self.fetched_at = time.monotonic()
+        self.fetches += 1
+
+    def _stale(self) -> bool:
+        if self.fetched_at is None:
+            return True
+        return time.monotonic() - self.fetched_at > self.max_age
+
+    def _refresh_due(self) -> bool:
+        if self.last_attempt is None:
+            return True
+        return time.monotonic() - self.last_attempt >= self.refresh_interval
+
+    async def get_signing_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        """
+        The key a token was signed with. An unknown key id or stale keys trigger
+        a refresh, at most one attempt per refresh interval whether it succeeds
+        or not, so neither forged key ids nor a Keycloak outage floods Keycloak.
+        """
+        key = self.keys.get(kid)
+        if key is not None and not self._stale():
+            return key
+
+        # Between attempts, wait for a fetch in flight but don't start one
+        if self._refresh_due() or self._lock.locked():
+            async with self._lock:
+                if self._refresh_due():
+                    try:
+                        await self.refresh()
+                    except KeycloakUnavailable:
+                        # Keep serving with the cached key while Keycloak is down
+                        if self.keys.get(kid) is None:
+                            raise
+            key = self.keys.get(kid)
+
+        if key is None:
+            if self.fetched_at is None:
+                raise KeycloakUnavailable("Keycloak keys have not been fetched yet")
+            raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+        return key
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token claims keyed by token digest, kept until exp."""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, Tuple[Dict[str, Any], float]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (claims, float(claims["exp"]))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
 class KeycloakAuth:
-    def __init__(self):
-        self.public_key = None
+    def __init__(
+        self,
+        jwks: Optional[JWKSFetcher] = None,
+        token_cache: Optional[VerifiedTokenCache] = None,
+    ):
+        self.jwks = jwks or JWKSFetcher()
+        self.token_cache = token_cache or VerifiedTokenCache()
         self.token_options = {
             "verify_signature": True,
             "verify_aud": False,
@@ -49,36 +190,31 @@ class KeycloakAuth:
             "require_jti": True,
         }
 
-    async def get_public_key(self) -> str:
-        """Get the public key from Keycloak for token verification."""
-        if self.public_key is None:
-            try:
-                # Get the public key from Keycloak
-                self.public_key = keycloak_openid.public_key()
-            except Exception as e:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail=f"Could not connect to Keycloak: {str(e)}",
-                )
-        return (
-            f"-----BEGIN PUBLIC KEY-----\n{self.public_key}\n-----END PUBLIC KEY-----"
-        )
-
     async def verify_token(self, token: str) -> Dict[str, Any]:
-        """Verify and decode a JWT token."""
+        """Verify and decode a JWT token, or return the claims it was verified with."""
+        claims = self.token_cache.get(token)
+        if claims is not None:
+            return claims
+
         try:
-            public_key = await self.get_public_key()
+            header = jwt.get_unverified_header(token)
+            signing_key = await self.jwks.get_signing_key(header.get("kid"))
 
             decoded_token = jwt.decode(
                 token,
-                public_key,
+                signing_key.key,
                 algorithms=["RS256"],
                 options=self.token_options,
                 issuer=f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}",
             )
 
+            self.token_cache.put(token, decoded_token)
             return decoded_token
 
+        except KeycloakUnavailable as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+            )
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired"
@@ -94,6 +230,13 @@ class KeycloakAuth:
                 detail=f"Token verification failed: {str(e)}",
             )
 
+    def stats(self) -> dict:
+        return {
+            "verified_tokens": self.token_cache.stats(),
+            "signing_keys": len(self.jwks.keys),
+            "jwks_fetches": self.jwks.fetches,
+        }
+
 
 auth = KeycloakAuth()
 
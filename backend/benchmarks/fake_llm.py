@@ -0,0 +1,198 @@
+"""
+Fake LLM Server
+
+An OpenAI-compatible chat completions server for load tests without Ollama. It
+streams filler tokens after a configurable first-token latency and at a
+configurable rate. The main agent can be scripted to call its tools before it
+answers, and structured outputs such as the intent check are answered through
+their output tool.
+
+Example usage (from the backend directory):
+
+python -m benchmarks.fake_llm --port 11500 --tokens-per-second 40 --script retrieve
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+FILLER = (
+    "Fireball is a 3rd-level evocation spell. Each creature in a 20-foot-radius "
+    "sphere makes a Dexterity saving throw, taking 8d6 fire damage on a failed "
+    "save or half as much on a success."
+).split()
+
+
+@dataclass
+class FakeLLMConfig:
+    first_token_ms: float = 300.0
+    tokens_per_second: float = 30.0
+    answer_tokens: int = 120
+    # Tools the agent calls, in order, before it answers
+    script: List[str] = field(default_factory=list)
+
+
+def last_user_text(messages: List[dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content)
+        return content
+    return ""
+
+
+def fill_arguments(tool: dict, question: str) -> str:
+    """Arguments for a tool call, from the tool's JSON schema."""
+    properties = tool["function"].get("parameters", {}).get("properties", {})
+    defaults = {"boolean": True, "string": question, "integer": 1, "number": 1.0}
+    return json.dumps(
+        {name: defaults.get(spec.get("type")) for name, spec in properties.items()}
+    )
+
+
+def next_tool_call(config: FakeLLMConfig, body: dict) -> Optional[dict]:
+    """The tool call the model makes next, or None to answer with text."""
+    tools = {tool["function"]["name"]: tool for tool in body.get("tools") or []}
+    messages = body.get("messages", [])
+    question = last_user_text(messages)
+
+    # Structured output, e.g. the intent check, always goes through its tool
+    for name, tool in tools.items():
+        if name.startswith("final_result"):
+            return {"name": name, "arguments": fill_arguments(tool, question)}
+
+    step = sum(1 for message in messages if message.get("role") == "tool")
+    if step < len(config.script) and config.script[step] in tools:
+        name = config.script[step]
+        return {"name": name, "arguments": fill_arguments(tools[name], question)}
+    return None
+
+
+def create_app(config: FakeLLMConfig) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+        tool_call = next_tool_call(config, body)
+        tokens = [
+            FILLER[index % len(FILLER)] + " " for index in range(config.answer_tokens)
+        ]
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        def tool_calls() -> list:
+            return [
+                {
+                    "index": 0,
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": tool_call,
+                }
+            ]
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.first_token_ms / 1000)
+            if tool_call is not None:
+                message = {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": tool_calls(),
+                }
+                finish_reason = "tool_calls"
+            else:
+                await asyncio.sleep(len(tokens) / config.tokens_per_second)
+                message = {"role": "assistant", "content": "".join(tokens)}
+                finish_reason = "stop"
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": message, "finish_reason": finish_reason}
+                ],
+                "usage": {
+                    "prompt_tokens": 0,
+                    "completion_tokens": len(tokens),
+                    "total_tokens": len(tokens),
+                },
+            }
+
+        async def stream():
+            await asyncio.sleep(config.first_token_ms / 1000)
+            if tool_call is not None:
+                yield chunk({"role": "assistant", "tool_calls": tool_calls()})
+                yield chunk({}, "tool_calls")
+            else:
+                yield chunk({"role": "assistant", "content": tokens[0]})
+                for token in tokens[1:]:
+                    await asyncio.sleep(1 / config.tokens_per_second)
+                    yield chunk({"content": token})
+                yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def serve(config: FakeLLMConfig, host: str = "127.0.0.1", port: int = 11500) -> None:
+    uvicorn.run(create_app(config), host=host, port=port, log_level="warning")
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument(
+        "--script",
+        nargs="*",
+        default=[],
+        help="Tools the main agent calls before answering, e.g. retrieve web_search",
+    )
+
+
+def config_from_arguments(args: argparse.Namespace) -> FakeLLMConfig:
+    return FakeLLMConfig(
+        first_token_ms=args.first_token_ms,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        script=args.script,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    add_arguments(parser)
+    args = parser.parse_args()
+    serve(config_from_arguments(args), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
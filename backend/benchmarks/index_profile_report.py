@@ -0,0 +1,156 @@
+"""
+Index Profile Report
+
+Compares the vector index profiles on a running Qdrant server. For every
+profile a collection of synthetic clustered unit vectors is built and indexed,
+then queried with the profile's search parameters. The report lists the
+estimated RAM of the dense index, p50/p99 query latency and recall@k against
+exact search as JSON. Local (":memory:") mode is not supported, as it neither
+builds HNSW graphs nor quantizes vectors.
+
+Example usage (from the backend directory):
+
+python -m benchmarks.index_profile_report
+python -m benchmarks.index_profile_report --points 100000 --profiles default compact
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from index_profiles import PROFILES, IndexProfile
+
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+VECTOR_NAME = "dense"
+UPLOAD_BATCH_SIZE = 1024
+INDEXING_TIMEOUT = 600
+
+
+def clustered_vectors(
+    rng: np.random.Generator, centroids: np.ndarray, count: int
+) -> np.ndarray:
+    """Unit vectors around the centroids, closer to embeddings than uniform noise."""
+    vectors = centroids[rng.integers(0, len(centroids), count)]
+    vectors = vectors + 0.5 * rng.standard_normal((count, centroids.shape[1]))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def wait_for_index(client: QdrantClient, collection_name: str) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < INDEXING_TIMEOUT:
+        info = client.get_collection(collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return time.perf_counter() - started
+        time.sleep(0.5)
+    raise TimeoutError(f"{collection_name} was not indexed in {INDEXING_TIMEOUT}s")
+
+
+def top_ids(client: QdrantClient, collection_name: str, query, k: int, params) -> List:
+    response = client.query_points(
+        collection_name=collection_name,
+        query=query.tolist(),
+        using=VECTOR_NAME,
+        limit=k,
+        search_params=params,
+    )
+    return [point.id for point in response.points]
+
+
+def profile_report(
+    client: QdrantClient,
+    profile: IndexProfile,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    keep: bool,
+) -> dict:
+    collection_name = f"index_profile_report_{profile.name}"
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={VECTOR_NAME: profile.vector_params(vectors.shape[1])},
+    )
+    for start in range(0, len(vectors), UPLOAD_BATCH_SIZE):
+        batch = vectors[start : start + UPLOAD_BATCH_SIZE]
+        client.upsert(
+            collection_name=collection_name,
+            points=models.Batch(
+                ids=list(range(start, start + len(batch))),
+                vectors={VECTOR_NAME: batch.tolist()},
+            ),
+            wait=True,
+        )
+    indexing_seconds = wait_for_index(client, collection_name)
+
+    exact = models.SearchParams(exact=True)
+    search_params = profile.search_params()
+    latencies, recalls = [], []
+    for query in queries:
+        expected = set(top_ids(client, collection_name, query, k, exact))
+        started = time.perf_counter()
+        found = top_ids(client, collection_name, query, k, search_params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(expected.intersection(found)) / k)
+
+    if not keep:
+        client.delete_collection(collection_name)
+
+    return {
+        "profile": profile.name,
+        "quantization": profile.quantization,
+        "on_disk": profile.on_disk,
+        "hnsw_m": profile.hnsw_m,
+        "hnsw_ef_construct": profile.hnsw_ef_construct,
+        "search_ef": profile.search_ef,
+        "oversampling": profile.oversampling,
+        "estimated_ram_mb": profile.estimate_memory_bytes(*vectors.shape) / 2**20,
+        "indexing_seconds": indexing_seconds,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        f"recall@{k}": float(np.mean(recalls)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=QDRANT_URL)
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES))
+    parser.add_argument("--points", type=int, default=50000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the benchmark collections"
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centroids = rng.standard_normal((args.clusters, args.dimensions))
+    vectors = clustered_vectors(rng, centroids, args.points)
+    queries = clustered_vectors(rng, centroids, args.queries)
+
+    client = QdrantClient(location=args.url, timeout=120)
+    reports = [
+        profile_report(client, PROFILES[name], vectors, queries, args.k, args.keep)
+        for name in args.profiles
+    ]
+    client.close()
+
+    print(
+        json.dumps(
+            {"points": args.points, "dimensions": args.dimensions, "profiles": reports},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Ingestion Throughput Benchmark
+
+Runs the indexing pipeline against a local in-memory Qdrant, or the Qdrant
+server given with --qdrant-url, and prints the chunks per second and peak RSS of
+the ingesting process and of its embedding workers as JSON, to help size
+ingestion nodes. Local Qdrant upserts one batch at a time, so --parallelism
+only takes effect against a server.
+
+Example usage (from the backend directory):
+
+python -m benchmarks.ingest_throughput
+python -m benchmarks.ingest_throughput --chunks 2000 --workers 4 \
+    --qdrant-url http://localhost:6333 --parallelism 8
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from typing import Iterator, List
+
+from qdrant_client import QdrantClient
+
+from ingest_pipeline import (
+    INGEST_BATCH_SIZE,
+    INGEST_EMBEDDING_WORKERS,
+    INGEST_QUEUE_SIZE,
+    INGEST_UPSERT_PARALLELISM,
+    ChunkRecord,
+    IndexingPipeline,
+)
+from passages import split_passages
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "fireball_page.md")
+COLLECTION_NAME = "ingest_benchmark"
+
+
+def peak_rss_mb(who: int) -> float:
+    # RUSAGE_CHILDREN covers only children that have exited and been reaped
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def fixture_chunks(path: str, count: int) -> Iterator[ChunkRecord]:
+    """Cycle through the passages of the fixture page, numbering each copy."""
+    with open(path) as f:
+        markdown = f.read()
+    texts: List[str] = [markdown[p.start : p.end] for p in split_passages(markdown)]
+    for index in range(count):
+        text = f"{texts[index % len(texts)]}\n\n(copy {index})"
+        yield ChunkRecord(id=index, text=text, metadata={"source": path})
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    client = QdrantClient(args.qdrant_url)
+    if client.collection_exists(COLLECTION_NAME):
+        client.delete_collection(COLLECTION_NAME)
+    pipeline = IndexingPipeline(
+        client,
+        COLLECTION_NAME,
+        batch_size=args.batch_size,
+        embedding_workers=args.workers,
+        upsert_parallelism=args.parallelism,
+        queue_size=args.queue_size,
+    )
+    # Load the model for the vector size outside the timed run
+    pipeline.ensure_collection()
+
+    started = time.perf_counter()
+    upserted = pipeline.run(
+        fixture_chunks(args.path, args.chunks), wait_for_workers=True
+    )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "chunks": upserted,
+        "points_in_collection": client.count(COLLECTION_NAME).count,
+        "batch_size": args.batch_size,
+        "embedding_workers": args.workers,
+        "upsert_parallelism": pipeline.upsert_parallelism,
+        "queue_size": args.queue_size,
+        "seconds": elapsed,
+        "chunks_per_second": upserted / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_worker_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", nargs="?", default=FIXTURE_PATH)
+    parser.add_argument("--qdrant-url", default=":memory:")
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=INGEST_EMBEDDING_WORKERS)
+    parser.add_argument("--parallelism", type=int, default=INGEST_UPSERT_PARALLELISM)
+    parser.add_argument("--queue-size", type=int, default=INGEST_QUEUE_SIZE)
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Intent Classifier Report
+
+Compares the embedding intent classifier with the LLM classifier driven by
+INTENT_SYSTEM_PROMPT on a labeled evaluation set and prints accuracy and latency
+as JSON.
+
+Example usage (from the backend directory):
+
+python -m benchmarks.intent_report
+python -m benchmarks.intent_report --skip-llm
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+import numpy as np
+
+from embeddings import EmbeddingService
+from intent_classifier import EmbeddingIntentClassifier
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "intent_eval.json")
+
+
+def latency_summary(samples_ms: List[float]) -> dict:
+    if not samples_ms:
+        return {}
+    return {
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p95_ms": float(np.percentile(samples_ms, 95)),
+        "max_ms": float(np.max(samples_ms)),
+    }
+
+
+def accuracy_summary(labels: List[bool], predictions: List[bool]) -> dict:
+    pairs = list(zip(labels, predictions))
+    return {
+        "accuracy": sum(label == pred for label, pred in pairs) / len(pairs),
+        "false_accepts": sum(pred and not label for label, pred in pairs),
+        "false_rejects": sum(label and not pred for label, pred in pairs),
+    }
+
+
+async def run_report(skip_llm: bool) -> dict:
+    with open(FIXTURE_PATH) as f:
+        fixture = json.load(f)
+    examples = [(q, True) for q in fixture["related"]] + [
+        (q, False) for q in fixture["unrelated"]
+    ]
+    labels = [label for _, label in examples]
+
+    embedder = EmbeddingService()
+    classifier = EmbeddingIntentClassifier(embedder)
+    await classifier.warmup()
+
+    local_predictions, embed_ms, decide_ms, uncertain = [], [], [], 0
+    for question, _ in examples:
+        started = time.perf_counter()
+        vector = await embedder.embed_dense_query(question)
+        embedded = time.perf_counter()
+        margin = classifier.margin(vector)
+        decision = classifier.decide(margin)
+        decided = time.perf_counter()
+
+        embed_ms.append((embedded - started) * 1000)
+        decide_ms.append((decided - embedded) * 1000)
+        if decision is None:
+            uncertain += 1
+            local_predictions.append(margin > 0)
+        else:
+            local_predictions.append(decision.is_related)
+
+    report = {
+        "examples": len(examples),
+        "embedding": {
+            **accuracy_summary(labels, local_predictions),
+            "uncertain_rate": uncertain / len(examples),
+            "embed_latency": latency_summary(embed_ms),
+            "decision_latency": latency_summary(decide_ms),
+        },
+    }
+
+    if not skip_llm:
+        from main import AgentFactory
+
+        _, intents_agent = AgentFactory().create_agents()
+        llm_predictions, llm_ms = [], []
+        for question, _ in examples:
+            started = time.perf_counter()
+            result = await intents_agent.run(question)
+            llm_ms.append((time.perf_counter() - started) * 1000)
+            llm_predictions.append(result.output)
+
+        # What the hybrid path would answer: local when confident, LLM otherwise
+        hybrid_predictions = []
+        for index, (question, _) in enumerate(examples):
+            vector = await embedder.embed_dense_query(question)
+            decision = classifier.decide(classifier.margin(vector))
+            hybrid_predictions.append(
+                llm_predictions[index] if decision is None else decision.is_related
+            )
+
+        report["llm"] = {
+            **accuracy_summary(labels, llm_predictions),
+            "latency": latency_summary(llm_ms),
+        }
+        report["hybrid"] = accuracy_summary(labels, hybrid_predictions)
+
+    embedder.close()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--skip-llm", action="store_true", help="Only evaluate the local classifier"
+    )
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_report(args.skip_llm)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+Load Test
+
+Drives concurrent streaming clients against the real FastAPI app, with local
+stand-ins for everything it depends on:
+- the LLM is the fake OpenAI-compatible server of benchmarks.fake_llm,
+- Qdrant is a local store built from the retrieval benchmark fixture,
+- web search returns a canned page after a configurable latency,
+- MongoDB is replaced by mongomock-motor,
+- tokens are signed with a key generated for the run, which the app fetches
+  from a stub JWKS route.
+
+The app runs in its own process next to an event-loop lag monitor. Prints
+time-to-first-token, tokens per second, latency percentiles and event-loop lag
+as JSON. With --compare-modes, the same load runs in tools mode and then in
+eager mode, and the report compares their time-to-first-token. Needs
+`pip install mongomock-motor` and the embedding models in the local fastembed
+cache.
+
+Example usage (from the backend directory):
+
+python -m benchmarks.load_harness --clients 16 --requests 200
+python -m benchmarks.load_harness --clients 32 --script retrieve web_search
+python -m benchmarks.load_harness --clients 32 --eager --web-latency-ms 1500
+python -m benchmarks.load_harness --clients 8 --compare-modes
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+import uuid
+from collections import deque
+from typing import List, Optional
+
+import httpx
+import jwt
+import numpy as np
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from benchmarks.fake_llm import (
+    FakeLLMConfig,
+    add_arguments,
+    config_from_arguments,
+    serve as serve_fake_llm,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+GOLDEN_PATH = os.path.join(FIXTURES, "retrieval_golden.json")
+WEB_PAGE_PATH = os.path.join(FIXTURES, "fireball_page.md")
+READY_TIMEOUT = 300
+LOOP_LAG_INTERVAL = 0.01
+ERROR_MARKER = "❌ Error occurred"
+
+
+class LoadTestTokenSigner:
+    """Signs access tokens shaped like Keycloak's with a key made for the run."""
+
+    def __init__(self, issuer: str):
+        self.issuer = issuer
+        self.kid = uuid.uuid4().hex
+        self._private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        )
+
+    def jwks(self) -> dict:
+        """The public key as a JSON Web Key Set, as Keycloak publishes it."""
+        jwk = RSAAlgorithm.to_jwk(self._private_key.public_key(), as_dict=True)
+        return {"keys": [{**jwk, "kid": self.kid, "use": "sig", "alg": "RS256"}]}
+
+    def sign(self, user_id: str, roles: Optional[List[str]] = None) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": self.issuer,
+            "sub": user_id,
+            "jti": uuid.uuid4().hex,
+            "iat": now,
+            "exp": now + 3600,
+            "preferred_username": user_id,
+            "realm_access": {"roles": roles or ["user"]},
+        }
+        return jwt.encode(
+            claims, self._private_key, algorithm="RS256", headers={"kid": self.kid}
+        )
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes up a periodic sleeper."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=100_000)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected) * 1000)
+
+    def stats(self) -> dict:
+        samples = list(self.samples)
+        if not samples:
+            return {"samples": 0}
+        return {"samples": len(samples), **percentiles(samples), "max": max(samples)}
+
+
+def percentiles(values: List[float]) -> dict:
+    return {f"p{p}": float(np.percentile(values, p)) for p in (50, 95, 99)}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_app(
+    port: int,
+    llm_url: str,
+    jwks: dict,
+    workdir: str,
+    web_latency_ms: float,
+    answer_cache: bool,
+) -> None:
+    """Entry point of the app process: wire in the stand-ins and serve the app."""
+    os.environ.update(
+        OLLAMA_URL=llm_url,
+        QDRANT_URL=":memory:",
+        CRAWLER_POOL_SIZE="0",
+        WEB_CACHE_PATH=os.path.join(workdir, "web_cache.sqlite3"),
+        INGEST_MANIFEST_PATH=os.path.join(workdir, "ingest_manifest.json"),
+        KEYCLOAK_JWKS_URL=f"http://127.0.0.1:{port}/_loadtest/jwks",
+        # The key set is served by the app itself, once it listens
+        WARMUP_RETRY_INTERVAL="1",
+    )
+    if not answer_cache:
+        # Cosine similarity never exceeds 1, so nothing is ever a cache hit
+        os.environ["ANSWER_CACHE_THRESHOLD"] = "1.01"
+
+    import uvicorn
+    from mongomock_motor import AsyncMongoMockClient
+    from qdrant_client import AsyncQdrantClient
+
+    import api
+    import chat_history
+    from benchmarks.retrieval_report import (
+        DOCUMENT_PATH,
+        build_collection,
+        paragraph_chunks,
+    )
+    from main import COLLECTION_NAME
+    from web_search import SearchList, SearchResult
+
+    chat_history.AsyncIOMotorClient = AsyncMongoMockClient
+
+    qdrant_path = os.path.join(workdir, "qdrant")
+    build_collection(qdrant_path, paragraph_chunks(DOCUMENT_PATH), COLLECTION_NAME)
+    client = AsyncQdrantClient(path=qdrant_path)
+    # Built ahead of the lifespan, which then only warms it up
+    api.build_services()
+    api.kb.qdrant_service.client = client
+    api.deps.client = client
+
+    with open(WEB_PAGE_PATH) as f:
+        page = f.read()
+
+    async def search_and_scrape(query: str, max_results: int = 3) -> SearchList:
+        await asyncio.sleep(web_latency_ms / 1000)
+        return SearchList(
+            results=[
+                SearchResult(
+                    url="https://example.com/fireball",
+                    title="Fireball",
+                    snippet=page[:160],
+                    scraped_content=page,
+                    scraped=True,
+                )
+            ]
+        )
+
+    api.kb.web_tool.search_and_scrape = search_and_scrape
+
+    @api.app.get("/_loadtest/jwks")
+    async def stub_jwks() -> dict:
+        return jwks
+
+    monitor = LoopLagMonitor()
+
+    @api.app.get("/_loadtest/loop_lag")
+    async def loop_lag() -> dict:
+        return monitor.stats()
+
+    @api.app.post("/_loadtest/loop_lag/reset")
+    async def reset_loop_lag() -> dict:
+        monitor.samples.clear()
+        return {"samples": 0}
+
+    async def run() -> None:
+        server = uvicorn.Server(
+            uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        monitor_task = asyncio.create_task(monitor.run())
+        try:
+            await server.serve()
+        finally:
+            monitor_task.cancel()
+
+    asyncio.run(run())
+
+
+async def wait_until_ready(base_url: str, process: multiprocessing.Process) -> None:
+    started = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() - started < READY_TIMEOUT:
+            if not process.is_alive():
+                raise RuntimeError("The app process exited during startup")
+            try:
+                if (await client.get(f"{base_url}/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"The app was not ready after {READY_TIMEOUT}s")
+
+
+async def ask(
+    client: httpx.AsyncClient,
+    base_url: str,
+    token: str,
+    question: str,
+    session_id: Optional[str],
+    eager: bool,
+) -> dict:
+    started = time.perf_counter()
+    first_token_at = None
+    body = ""
+    async with client.stream(
+        "POST",
+        f"{base_url}/ask/stream",
+        json={"question": question, "session_id": session_id, "eager": eager},
+        headers={"Authorization": f"Bearer {token}"},
+    ) as response:
+        async for text in response.aiter_text():
+            if text and first_token_at is None:
+                first_token_at = time.perf_counter()
+            body += text
+    finished = time.perf_counter()
+
+    ok = response.status_code == 200 and body and ERROR_MARKER not in body
+    result = {"ok": bool(ok), "latency_ms": (finished - started) * 1000}
+    if ok and first_token_at is not None:
+        result["ttft_ms"] = (first_token_at - started) * 1000
+        streaming = finished - first_token_at
+        if streaming > 0:
+            # The fake model streams one word per token
+            result["tokens_per_second"] = len(body.split()) / streaming
+    return result
+
+
+async def drive(
+    args: argparse.Namespace, base_url: str, signer: LoadTestTokenSigner, eager: bool
+) -> dict:
+    with open(GOLDEN_PATH) as f:
+        questions = [item["question"] for item in json.load(f)]
+    pending = iter(range(args.requests))
+    results: List[dict] = []
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(120, connect=10)) as client:
+
+        async def run_client(index: int) -> None:
+            token = signer.sign(f"load-test-user-{index}")
+            session_id = None
+            if args.sessions:
+                response = await client.post(
+                    f"{base_url}/chat/sessions",
+                    json={"title": f"Load test {index}"},
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                session_id = response.json()["id"]
+            for request_index in pending:
+                question = questions[request_index % len(questions)]
+                try:
+                    result = await ask(
+                        client, base_url, token, question, session_id, eager
+                    )
+                except httpx.HTTPError as e:
+                    result = {"ok": False, "error": str(e)}
+                results.append(result)
+
+        # Load the models and warm the caches outside the measurement
+        warmup_token = signer.sign("load-test-warmup")
+        for question in questions[:2]:
+            await ask(client, base_url, warmup_token, question, None, eager)
+        await client.post(f"{base_url}/_loadtest/loop_lag/reset")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client(index) for index in range(args.clients)))
+        duration = time.perf_counter() - started
+        loop_lag = (await client.get(f"{base_url}/_loadtest/loop_lag")).json()
+
+    succeeded = [result for result in results if result["ok"]]
+    ttfts = [result["ttft_ms"] for result in succeeded if "ttft_ms" in result]
+    latencies = [result["latency_ms"] for result in succeeded]
+    rates = [
+        result["tokens_per_second"]
+        for result in succeeded
+        if "tokens_per_second" in result
+    ]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(succeeded),
+        "duration_s": duration,
+        "requests_per_second": len(results) / duration if duration else 0.0,
+        "ttft_ms": percentiles(ttfts) if ttfts else {},
+        "latency_ms": percentiles(latencies) if latencies else {},
+        "tokens_per_second": (
+            {"mean": float(np.mean(rates)), "p5": float(np.percentile(rates, 5))}
+            if rates
+            else {}
+        ),
+        "event_loop_lag_ms": loop_lag,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--eager", action="store_true", help="Use eager answering")
+    parser.add_argument(
+        "--compare-modes",
+        action="store_true",
+        help="Run the load in tools mode, then in eager mode, and compare TTFT",
+    )
+    parser.add_argument(
+        "--no-sessions",
+        dest="sessions",
+        action="store_false",
+        help="Ask standalone questions instead of saving them to chat sessions",
+    )
+    parser.add_argument("--web-latency-ms", type=float, default=800.0)
+    parser.add_argument(
+        "--answer-cache", action="store_true", help="Allow cached answers"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    from auth import KEYCLOAK_REALM, KEYCLOAK_URL
+
+    signer = LoadTestTokenSigner(f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}")
+    llm_config: FakeLLMConfig = config_from_arguments(args)
+    llm_port, app_port = free_port(), free_port()
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        llm = context.Process(
+            target=serve_fake_llm,
+            args=(llm_config, "127.0.0.1", llm_port),
+            daemon=True,
+        )
+        app = context.Process(
+            target=serve_app,
+            args=(
+                app_port,
+                f"http://127.0.0.1:{llm_port}/v1",
+                signer.jwks(),
+                workdir,
+                args.web_latency_ms,
+                args.answer_cache,
+            ),
+        )
+        llm.start()
+        app.start()
+        base_url = f"http://127.0.0.1:{app_port}"
+        try:
+            asyncio.run(wait_until_ready(base_url, app))
+            modes = [False, True] if args.compare_modes else [args.eager]
+            runs = {
+                "eager" if eager else "tools": asyncio.run(
+                    drive(args, base_url, signer, eager)
+                )
+                for eager in modes
+            }
+        finally:
+            app.terminate()
+            llm.terminate()
+            app.join()
+            llm.join()
+
+    report = {
+        "clients": args.clients,
+        "sessions": args.sessions,
+        "web_latency_ms": args.web_latency_ms,
+        "llm": vars(llm_config),
+    }
+    if args.compare_modes:
+        report["modes"] = runs
+        tools_p50 = runs["tools"]["ttft_ms"].get("p50")
+        eager_p50 = runs["eager"]["ttft_ms"].get("p50")
+        if tools_p50 and eager_p50:
+            report["eager_ttft_p50_speedup"] = tools_p50 / eager_p50
+    else:
+        report.update({"eager": args.eager, **runs.popitem()[1]})
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
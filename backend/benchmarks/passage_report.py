@@ -0,0 +1,101 @@
+"""
+Passage Selection Report
+
+Measures how much the passage selection stage shrinks scraped pages before they
+reach the model, and what it costs. Prints prompt tokens before and after
+selection, selection latency and, optionally, the answer latency of the model
+with the full page versus the selected passages as JSON.
+
+Example usage (from the backend directory):
+
+python -m benchmarks.passage_report
+python -m benchmarks.passage_report --query "How does counterspell work?" page.md
+python -m benchmarks.passage_report --llm
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+import numpy as np
+
+from context_builder import estimate_tokens
+from embeddings import EmbeddingService
+from passages import PassageSelector
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "fireball_page.md")
+DEFAULT_QUERY = "Describe the spell Fireball in D&D 5e."
+REPEATS = 5
+
+
+async def answer_latency_ms(agent, query: str, content: str) -> float:
+    started = time.perf_counter()
+    await agent.run(f"QUESTION:\n{query}\n\nWEB SEARCH:\n{content}")
+    return (time.perf_counter() - started) * 1000
+
+
+async def run_report(query: str, paths: List[str], with_llm: bool) -> dict:
+    embedder = EmbeddingService()
+    selector = PassageSelector(embedder)
+    agent = None
+    if with_llm:
+        from main import AgentFactory
+
+        agent = AgentFactory().create_answer_agent()
+
+    pages = []
+    for path in paths:
+        with open(path) as f:
+            markdown = f.read()
+
+        latencies = []
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            passages = await selector.select(query, markdown)
+            latencies.append((time.perf_counter() - started) * 1000)
+        selected = selector.join(markdown, passages)
+
+        page = {
+            "path": path,
+            "original_tokens": estimate_tokens(markdown),
+            "selected_tokens": estimate_tokens(selected),
+            "passages": [p.model_dump() for p in passages],
+            "selection_p50_ms": float(np.percentile(latencies, 50)),
+        }
+        page["token_reduction"] = 1 - page["selected_tokens"] / page["original_tokens"]
+
+        if agent is not None:
+            page["answer_full_ms"] = await answer_latency_ms(agent, query, markdown)
+            page["answer_selected_ms"] = await answer_latency_ms(agent, query, selected)
+
+        pages.append(page)
+
+    embedder.close()
+    return {
+        "query": query,
+        "token_budget": selector.token_budget,
+        "original_tokens": sum(p["original_tokens"] for p in pages),
+        "selected_tokens": sum(p["selected_tokens"] for p in pages),
+        "pages": pages,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("paths", nargs="*", default=[FIXTURE_PATH])
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument(
+        "--llm",
+        action="store_true",
+        help="Also time a model answer with the full page and with the passages",
+    )
+    args = parser.parse_args()
+    report = asyncio.run(run_report(args.query, args.paths, args.llm))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Retrieval Report
+
+Measures retrieval quality and latency offline. The fixture document is chunked
+and indexed through the ingestion pipeline into a local Qdrant in a temporary
+directory, then every question of the golden set is run through
+QdrantService.query_documents. A retrieved chunk is relevant when it contains
+one of the question's evidence strings. Prints recall@k, MRR, nDCG@k and
+p50/p95/p99 latency as JSON, so runs can be compared across commits.
+
+Needs neither network access, Ollama nor Docker once the embedding models are
+in the local fastembed cache. Environment variables such as EMBEDDING_MODEL,
+RERANK_MODEL or PREFETCH_LIMIT apply as in the server.
+
+Example usage (from the backend directory):
+
+python -m benchmarks.retrieval_report
+python -m benchmarks.retrieval_report --k 10 --chunker docling --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from embeddings import (
+    EMBEDDING_MODEL,
+    RERANK_MODEL,
+    SPARSE_MODEL,
+    EmbeddingService,
+    normalize_text,
+)
+from ingest_pipeline import ChunkRecord, IndexingPipeline
+from main import PREFETCH_LIMIT, QUERY_LIMIT, QdrantService, QueryVectorCache
+from passages import split_passages
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+DOCUMENT_PATH = os.path.join(FIXTURES, "rules_reference.md")
+GOLDEN_PATH = os.path.join(FIXTURES, "retrieval_golden.json")
+COLLECTION_NAME = "retrieval_report"
+
+
+def paragraph_chunks(path: str) -> List[str]:
+    with open(path) as f:
+        markdown = f.read()
+    return [markdown[p.start : p.end] for p in split_passages(markdown)]
+
+
+def docling_chunks(path: str) -> List[str]:
+    """Chunk the document the way ingestion chunks PDFs."""
+    from docling.chunking import HybridChunker
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter
+
+    result = DocumentConverter(allowed_formats=[InputFormat.MD]).convert(path)
+    return [chunk.text for chunk in HybridChunker().chunk(result.document)]
+
+
+CHUNKERS = {"paragraphs": paragraph_chunks, "docling": docling_chunks}
+
+
+def build_collection(
+    path: str, chunks: List[str], collection_name: str = COLLECTION_NAME
+) -> None:
+    """Index the chunks into a local Qdrant stored at `path`."""
+    client = QdrantClient(path=path)
+    try:
+        # Local Qdrant is not thread-safe, so upsert one batch at a time
+        pipeline = IndexingPipeline(
+            client, collection_name, embedding_workers=1, upsert_parallelism=1
+        )
+        pipeline.run(
+            ChunkRecord(id=index, text=text, metadata={"source": DOCUMENT_PATH})
+            for index, text in enumerate(chunks)
+        )
+    finally:
+        client.close()
+
+
+def is_relevant(chunk: str, evidence: List[str]) -> bool:
+    chunk = normalize_text(chunk)
+    return any(normalize_text(e) in chunk for e in evidence)
+
+
+def question_metrics(
+    retrieved: List[str], evidence: List[str], relevant_total: int, k: int
+) -> dict:
+    relevance = [is_relevant(chunk, evidence) for chunk in retrieved[:k]]
+    found = normalize_text(" ".join(retrieved[:k]))
+    recall = sum(normalize_text(e) in found for e in evidence) / len(evidence)
+    first = next((rank for rank, rel in enumerate(relevance, 1) if rel), None)
+    dcg = sum(1 / math.log2(rank + 1) for rank, rel in enumerate(relevance, 1) if rel)
+    ideal_hits = min(relevant_total, k)
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, ideal_hits + 1))
+    return {
+        "recall": recall,
+        "reciprocal_rank": 1 / first if first else 0.0,
+        "ndcg": dcg / ideal if ideal else 0.0,
+    }
+
+
+async def run_report(chunks: List[str], golden: List[dict], k: int, path: str) -> dict:
+    embedder = EmbeddingService()
+    service = QdrantService(embedder=embedder, client=AsyncQdrantClient(path=path))
+    # Every question must pay for its embedding, as a new question would
+    service.vector_cache = QueryVectorCache(max_entries=0)
+
+    await service.query_documents(COLLECTION_NAME, "warm up", k)
+
+    questions, latencies = [], []
+    for item in golden:
+        started = time.perf_counter()
+        documents = await service.query_documents(COLLECTION_NAME, item["question"], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        retrieved = [document.strip() for document in documents]
+        relevant_total = sum(is_relevant(chunk, item["evidence"]) for chunk in chunks)
+        metrics = question_metrics(retrieved, item["evidence"], relevant_total, k)
+        questions.append({"question": item["question"], **metrics})
+
+    await service.close()
+    embedder.close()
+
+    return {
+        f"recall@{k}": float(np.mean([q["recall"] for q in questions])),
+        "mrr": float(np.mean([q["reciprocal_rank"] for q in questions])),
+        f"ndcg@{k}": float(np.mean([q["ndcg"] for q in questions])),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "questions": questions,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--document", default=DOCUMENT_PATH)
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--k", type=int, default=QUERY_LIMIT)
+    parser.add_argument("--chunker", choices=list(CHUNKERS), default="paragraphs")
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    with open(args.golden) as f:
+        golden = json.load(f)
+    chunks = CHUNKERS[args.chunker](args.document)
+
+    with tempfile.TemporaryDirectory() as path:
+        build_collection(path, chunks)
+        metrics = asyncio.run(run_report(chunks, golden, args.k, path))
+
+    report = {
+        "commit": git_commit(),
+        "chunker": args.chunker,
+        "chunks": len(chunks),
+        "k": args.k,
+        "prefetch_limit": PREFETCH_LIMIT,
+        "embedding_model": EMBEDDING_MODEL,
+        "sparse_model": SPARSE_MODEL,
+        "rerank_model": RERANK_MODEL or None,
+        **metrics,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Browser Pool Module
+
+This module keeps a fixed number of headless browsers alive for web scraping
+instead of launching Chromium for every search. Browsers are health checked,
+recycled after a number of pages, and callers wait in a bounded queue when all
+of them are busy.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig
+
+# Configuration
+CRAWLER_POOL_SIZE = int(os.getenv("CRAWLER_POOL_SIZE", "2"))
+CRAWLER_MAX_PAGES = int(os.getenv("CRAWLER_MAX_PAGES", "50"))
+CRAWLER_MAX_WAITERS = int(os.getenv("CRAWLER_MAX_WAITERS", "16"))
+CRAWLER_ACQUIRE_TIMEOUT = float(os.getenv("CRAWLER_ACQUIRE_TIMEOUT", "10"))
+CRAWLER_HEALTH_INTERVAL = float(os.getenv("CRAWLER_HEALTH_INTERVAL", "60"))
+CRAWLER_HEALTH_TIMEOUT = float(os.getenv("CRAWLER_HEALTH_TIMEOUT", "5"))
+
+HEALTH_CHECK_URL = "raw:<html><body>ok</body></html>"
+
+
+class CrawlerPoolExhausted(Exception):
+    """Raised when no browser becomes available in time or too many callers wait."""
+
+
+@dataclass
+class PooledCrawler:
+    crawler: Optional[AsyncWebCrawler] = None
+    pages: int = 0
+    last_checked: float = 0.0
+
+
+class CrawlerPool:
+    """Fixed-size pool of long-lived AsyncWebCrawler instances."""
+
+    def __init__(
+        self,
+        size: int = CRAWLER_POOL_SIZE,
+        max_pages: int = CRAWLER_MAX_PAGES,
+        max_waiters: int = CRAWLER_MAX_WAITERS,
+        acquire_timeout: float = CRAWLER_ACQUIRE_TIMEOUT,
+        health_interval: float = CRAWLER_HEALTH_INTERVAL,
+        browser_config: Optional[BrowserConfig] = None,
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_waiters = max_waiters
+        self.acquire_timeout = acquire_timeout
+        self.health_interval = health_interval
+        self.browser_config = browser_config or BrowserConfig(headless=True)
+        self.waiters = 0
+        self.recycled = 0
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots: List[PooledCrawler] = []
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+    async def _launch(self, pooled: PooledCrawler) -> None:
+        crawler = AsyncWebCrawler(config=self.browser_config)
+        await crawler.start()
+        pooled.crawler = crawler
+        pooled.pages = 0
+        pooled.last_checked = time.monotonic()
+
+    async def _shutdown(self, pooled: PooledCrawler) -> None:
+        crawler, pooled.crawler = pooled.crawler, None
+        if crawler is not None:
+            try:
+                await crawler.close()
+            except Exception as e:
+                print(f"Failed to close browser: {e}", flush=True)
+
+    async def start(self) -> None:
+        """Launch the browsers. Safe to call more than once."""
+        async with self._start_lock:
+            if self._started:
+                return
+            self._slots = [PooledCrawler() for _ in range(self.size)]
+            results = await asyncio.gather(
+                *(self._launch(pooled) for pooled in self._slots),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    # The slot is retried the next time it is acquired
+                    print(f"Failed to launch browser: {result}", flush=True)
+            for pooled in self._slots:
+                self._idle.put_nowait(pooled)
+            self._started = True
+
+    async def close(self) -> None:
+        """Close every browser in the pool."""
+        async with self._start_lock:
+            await asyncio.gather(*(self._shutdown(pooled) for pooled in self._slots))
+            self._slots = []
+            self._idle = asyncio.Queue()
+            self._started = False
+
+    async def _is_healthy(self, crawler: AsyncWebCrawler) -> bool:
+        try:
+            result = await asyncio.wait_for(
+                crawler.arun(
+                    url=HEALTH_CHECK_URL,
+                    config=CrawlerRunConfig(cache_mode=CacheMode.BYPASS),
+                ),
+                timeout=CRAWLER_HEALTH_TIMEOUT,
+            )
+            return result.success
+        except Exception:
+            return False
+
+    async def _prepare(self, pooled: PooledCrawler) -> None:
+        """Make sure the pooled browser is running, fresh and healthy."""
+        if pooled.crawler is not None and pooled.pages >= self.max_pages:
+            await self._shutdown(pooled)
+            self.recycled += 1
+
+        if (
+            pooled.crawler is not None
+            and time.monotonic() - pooled.last_checked > self.health_interval
+        ):
+            if await self._is_healthy(pooled.crawler):
+                pooled.last_checked = time.monotonic()
+            else:
+                await self._shutdown(pooled)
+                self.recycled += 1
+
+        if pooled.crawler is None:
+            await self._launch(pooled)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[AsyncWebCrawler]:
+        """Borrow a browser, waiting in a bounded queue if all of them are busy."""
+        await self.start()
+
+        if self.waiters >= self.max_waiters:
+            raise CrawlerPoolExhausted("Too many requests waiting for a browser")
+
+        self.waiters += 1
+        try:
+            pooled = await asyncio.wait_for(
+                self._idle.get(), timeout=self.acquire_timeout
+            )
+        except asyncio.TimeoutError:
+            raise CrawlerPoolExhausted("Timed out waiting for a browser")
+        finally:
+            self.waiters -= 1
+
+        try:
+            await self._prepare(pooled)
+            yield pooled.crawler
+        except BaseException:
+            # Check the browser before it is handed out again, also when the
+            # crawl was cancelled halfway, e.g. by a scrape timeout
+            pooled.last_checked = 0.0
+            raise
+        finally:
+            pooled.pages += 1
+            self._idle.put_nowait(pooled)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "waiters": self.waiters,
+            "recycled": self.recycled,
+        }
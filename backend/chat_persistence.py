@@ -0,0 +1,282 @@
+"""
+Chat Persistence Module
+
+This module takes chat history writes off the request path. Requests hand their
+messages to a write-behind queue and go on; a background flusher applies them to
+MongoDB. Streamed answers are checkpointed every CHECKPOINT_TOKENS tokens or
+CHECKPOINT_INTERVAL_MS milliseconds into a single message slot. A checkpoint that
+is still queued is replaced by the next one, so a slow database sees at most one
+pending write per message. The final write happens on completion, on error and
+when the client disconnects, so a cancelled answer is kept up to where it got.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from chat_history import ChatHistoryManager
+
+# Configuration
+CHECKPOINT_TOKENS = int(os.getenv("CHECKPOINT_TOKENS", "32"))
+CHECKPOINT_INTERVAL_MS = int(os.getenv("CHECKPOINT_INTERVAL_MS", "500"))
+# Queued messages before opening a new one waits for the flusher
+CHAT_WRITE_QUEUE_SIZE = int(os.getenv("CHAT_WRITE_QUEUE_SIZE", "1000"))
+CHAT_WRITE_RETRIES = int(os.getenv("CHAT_WRITE_RETRIES", "3"))
+CHAT_WRITE_RETRY_DELAY = 0.5
+# How long shutdown waits for queued writes
+CHAT_WRITE_FLUSH_TIMEOUT = float(os.getenv("CHAT_WRITE_FLUSH_TIMEOUT", "10"))
+
+
+@dataclass
+class MessageWrite:
+    """The latest content of a message waiting to be written."""
+
+    key: str
+    session_id: str
+    user_id: str
+    is_user: bool
+    content: str
+    final: bool
+    attempts: int = 0
+
+
+class StreamingMessage:
+    """A message slot that is written as it grows and closed with `finish`."""
+
+    def __init__(
+        self,
+        writer: "ChatWriteBehind",
+        session_id: str,
+        user_id: str,
+        is_user: bool,
+        checkpoint_tokens: int = CHECKPOINT_TOKENS,
+        checkpoint_interval_ms: int = CHECKPOINT_INTERVAL_MS,
+    ):
+        self.writer = writer
+        self.key = uuid.uuid4().hex
+        self.session_id = session_id
+        self.user_id = user_id
+        self.is_user = is_user
+        self.checkpoint_tokens = checkpoint_tokens
+        self.checkpoint_interval = checkpoint_interval_ms / 1000
+        self.finished = False
+        self._tokens_since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def _write(self, content: str, final: bool) -> None:
+        self.writer.submit(
+            MessageWrite(
+                key=self.key,
+                session_id=self.session_id,
+                user_id=self.user_id,
+                is_user=self.is_user,
+                content=content,
+                final=final,
+            )
+        )
+
+    def update(self, content: str) -> None:
+        """Record one more streamed token; checkpoint `content` when one is due."""
+        if self.finished:
+            return
+        self._tokens_since_checkpoint += 1
+        now = time.monotonic()
+        if (
+            self._tokens_since_checkpoint >= self.checkpoint_tokens
+            or now - self._last_checkpoint >= self.checkpoint_interval
+        ):
+            self._write(content, final=False)
+            self._tokens_since_checkpoint = 0
+            self._last_checkpoint = now
+
+    def finish(self, content: str) -> None:
+        """Write the final content. Never blocks, so it is safe while cancelled."""
+        if self.finished:
+            return
+        self.finished = True
+        self._write(content, final=True)
+
+
+class ChatWriteBehind:
+    """Bounded, coalescing write-behind queue in front of the chat history."""
+
+    def __init__(
+        self,
+        history: ChatHistoryManager,
+        max_pending: int = CHAT_WRITE_QUEUE_SIZE,
+        retries: int = CHAT_WRITE_RETRIES,
+    ):
+        self.history = history
+        self.max_pending = max_pending
+        self.retries = retries
+        self.written = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.dropped = 0
+        # Latest write per message, in the order the messages were opened
+        self._pending: OrderedDict[str, MessageWrite] = OrderedDict()
+        self._in_flight = 0
+        # Seq of messages that were created but not finished yet
+        self._slots: Dict[str, int] = {}
+        # Messages whose append failed, possibly after it was stored
+        self._unconfirmed: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def submit(self, write: MessageWrite) -> None:
+        """Queue a write, replacing a queued write of the same message."""
+        if write.key in self._pending:
+            self.coalesced += 1
+        self._pending[write.key] = write
+        self._idle.clear()
+        if len(self._pending) >= self.max_pending:
+            self._space.clear()
+        self._wakeup.set()
+        self._ensure_worker()
+
+    async def open_message(
+        self, session_id: str, user_id: str, is_user: bool
+    ) -> StreamingMessage:
+        """Start a message, waiting first while the queue is full."""
+        while len(self._pending) >= self.max_pending:
+            self._ensure_worker()
+            self._space.clear()
+            await self._space.wait()
+        return StreamingMessage(self, session_id, user_id, is_user)
+
+    async def append(
+        self, session_id: str, user_id: str, content: str, is_user: bool
+    ) -> None:
+        """Queue a complete message."""
+        message = await self.open_message(session_id, user_id, is_user)
+        message.finish(content)
+
+    async def _apply(self, write: MessageWrite) -> None:
+        seq = self._slots.get(write.key)
+        if seq is None and write.key in self._unconfirmed:
+            # Don't append the message twice when only the reply got lost
+            seq = await self.history.find_message_seq(
+                write.session_id, write.user_id, write.key
+            )
+        if seq is None:
+            seq = await self.history.append_message(
+                write.session_id,
+                write.user_id,
+                write.content,
+                write.is_user,
+                key=write.key,
+            )
+            if seq is None:
+                # The session was deleted in the meantime
+                self._unconfirmed.discard(write.key)
+                self.dropped += 1
+                return
+        else:
+            await self.history.set_message_content(
+                write.session_id,
+                write.user_id,
+                seq,
+                write.content,
+                touch_session=write.final,
+            )
+        self._unconfirmed.discard(write.key)
+        if write.final:
+            self._slots.pop(write.key, None)
+        else:
+            self._slots[write.key] = seq
+        self.written += 1
+
+    def _requeue(self, writes: List[MessageWrite]) -> None:
+        """Queue writes ahead of newer ones, unless a newer write replaced them."""
+        for write in reversed(writes):
+            if write.key not in self._pending:
+                self._pending[write.key] = write
+                self._pending.move_to_end(write.key, last=False)
+
+    async def _apply_in_order(self, writes: List[MessageWrite]) -> bool:
+        """
+        Apply one session's writes in order, so its messages keep their order.
+        Returns False when some of them were queued again to be retried.
+        """
+        for index, write in enumerate(writes):
+            try:
+                await self._apply(write)
+            except Exception as e:
+                if write.key not in self._slots:
+                    self._unconfirmed.add(write.key)
+                write.attempts += 1
+                if write.attempts > self.retries:
+                    self.failed += 1
+                    self._slots.pop(write.key, None)
+                    self._unconfirmed.discard(write.key)
+                    print(f"Saving a chat message failed: {e}", flush=True)
+                    continue
+                self._requeue(writes[index:])
+                return False
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+
+            batch, self._pending = self._pending, OrderedDict()
+            self._in_flight = len(batch)
+            self._space.set()
+            by_session: Dict[str, List[MessageWrite]] = {}
+            for write in batch.values():
+                by_session.setdefault(write.session_id, []).append(write)
+            applied = await asyncio.gather(
+                *(self._apply_in_order(writes) for writes in by_session.values())
+            )
+            self._in_flight = 0
+            if not all(applied):
+                await asyncio.sleep(CHAT_WRITE_RETRY_DELAY)
+
+            if self._pending:
+                self._wakeup.set()
+            else:
+                self._idle.set()
+
+    async def flush(self) -> None:
+        """Wait until every queued write was applied."""
+        if self._pending or self._in_flight:
+            self._ensure_worker()
+            await self._idle.wait()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._pending),
+            "in_flight": self._in_flight,
+            "open_messages": len(self._slots),
+            "written": self.written,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    async def close(self, timeout: float = CHAT_WRITE_FLUSH_TIMEOUT) -> None:
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            print(
+                f"Dropping {len(self._pending)} unsaved chat writes on shutdown",
+                flush=True,
+            )
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
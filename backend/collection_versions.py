@@ -0,0 +1,248 @@
+"""
+Collection Versions Module
+
+This module lets ingestion rebuild the knowledge base without users ever querying
+a half-built index. Every build writes into a new versioned collection such as
+`handbook_v3`, is validated by point count and smoke queries, and is then put
+live by atomically repointing the `handbook` alias that retrieval queries. Old
+versions are kept for rollback up to a retention limit and then deleted.
+"""
+
+import os
+import re
+import time
+from typing import Iterable, List, Optional
+
+from qdrant_client import QdrantClient, models
+
+from embeddings import EMBEDDING_MODEL, dense_vector_name
+
+# Configuration
+# Validated versions to keep, including the live one
+COLLECTION_RETENTION = int(os.getenv("COLLECTION_RETENTION", "3"))
+# Semicolon separated queries every new version must answer
+SMOKE_QUERIES = os.getenv(
+    "SMOKE_QUERIES",
+    "What does the Fireball spell do?;How is Armor Class calculated?;"
+    "What are the six ability scores?",
+)
+COPY_BATCH_SIZE = int(os.getenv("COPY_BATCH_SIZE", "256"))
+ALIAS_RETRIES = 5
+ALIAS_RETRY_DELAY = 1.0
+
+
+class CollectionVersionError(Exception):
+    """Raised when a version fails validation or cannot be switched to."""
+
+
+class CollectionVersions:
+    """Versioned physical collections behind a single alias."""
+
+    def __init__(self, client: QdrantClient, alias: str):
+        self.client = client
+        self.alias = alias
+        self._pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+
+    def version_name(self, version: int) -> str:
+        return f"{self.alias}_v{version}"
+
+    def _collection_names(self) -> List[str]:
+        return [c.name for c in self.client.get_collections().collections]
+
+    def versions(self) -> List[str]:
+        """Names of the versioned collections, oldest first."""
+        versions = []
+        for name in self._collection_names():
+            match = self._pattern.match(name)
+            if match:
+                versions.append((int(match.group(1)), name))
+        return [name for _, name in sorted(versions)]
+
+    def is_legacy(self) -> bool:
+        """Whether the alias name is still taken by a physical collection."""
+        return self.alias in self._collection_names()
+
+    def current(self) -> Optional[str]:
+        """Physical collection retrieval queries, if any."""
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == self.alias:
+                return alias.collection_name
+        return self.alias if self.is_legacy() else None
+
+    def next_name(self) -> str:
+        versions = self.versions()
+        latest = int(self._pattern.match(versions[-1]).group(1)) if versions else 0
+        return self.version_name(latest + 1)
+
+    def copy_points(self, source: str, target: str, ids: List[str]) -> int:
+        """Copy points with their vectors, so unchanged chunks are not embedded again."""
+        for start in range(0, len(ids), COPY_BATCH_SIZE):
+            records = self.client.retrieve(
+                collection_name=source,
+                ids=ids[start : start + COPY_BATCH_SIZE],
+                with_payload=True,
+                with_vectors=True,
+            )
+            self.client.upsert(
+                collection_name=target,
+                points=[
+                    models.PointStruct(
+                        id=record.id, vector=record.vector, payload=record.payload
+                    )
+                    for record in records
+                ],
+                wait=True,
+            )
+        return len(ids)
+
+    def migrate_legacy(self) -> str:
+        """
+        Turn a physical collection named like the alias into the first version
+        behind the alias, and return that version's name. The points are copied
+        to the version before the legacy collection is deleted. Qdrant can't
+        free a collection name and create an alias in one operation, so queries
+        fail for the moment between the deletion and the alias creation. The
+        alias creation is retried, and a migration interrupted before the
+        deletion starts over on the next call.
+        """
+        name = self.next_name()
+        info = self.client.get_collection(self.alias)
+        params = info.config.params
+        self.client.create_collection(
+            collection_name=name,
+            vectors_config=params.vectors,
+            sparse_vectors_config=params.sparse_vectors,
+        )
+
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.alias,
+                limit=COPY_BATCH_SIZE,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if records:
+                self.client.upsert(
+                    collection_name=name,
+                    points=[
+                        models.PointStruct(
+                            id=record.id, vector=record.vector, payload=record.payload
+                        )
+                        for record in records
+                    ],
+                    wait=True,
+                )
+            if offset is None:
+                break
+
+        count = self.client.count(collection_name=name, exact=True).count
+        expected = self.client.count(collection_name=self.alias, exact=True).count
+        if count != expected:
+            self.client.delete_collection(name)
+            raise CollectionVersionError(
+                f"Copying {self.alias} to {name} left {count} of {expected} points"
+            )
+
+        self.client.delete_collection(self.alias)
+        for attempt in range(ALIAS_RETRIES):
+            try:
+                self.swap(name)
+                break
+            except Exception:
+                if attempt == ALIAS_RETRIES - 1:
+                    raise
+                time.sleep(ALIAS_RETRY_DELAY)
+        return name
+
+    def validate(self, name: str, expected_count: int) -> None:
+        """Check the point count and that every smoke query finds documents."""
+        count = self.client.count(collection_name=name, exact=True).count
+        if count == 0 or count != expected_count:
+            raise CollectionVersionError(
+                f"{name} has {count} points, expected {expected_count}"
+            )
+
+        from fastembed import TextEmbedding
+
+        model = TextEmbedding(model_name=EMBEDDING_MODEL)
+        queries = [q.strip() for q in SMOKE_QUERIES.split(";") if q.strip()]
+        for query, vector in zip(queries, model.query_embed(queries)):
+            response = self.client.query_points(
+                collection_name=name,
+                query=vector.tolist(),
+                using=dense_vector_name(EMBEDDING_MODEL),
+                limit=1,
+                with_payload=True,
+            )
+            if not response.points or not response.points[0].payload.get("document"):
+                raise CollectionVersionError(
+                    f"{name} returned no documents for smoke query {query!r}"
+                )
+
+    def swap(self, name: str) -> None:
+        """Atomically point the alias at `name`."""
+        if self.is_legacy():
+            raise CollectionVersionError(
+                f"{self.alias} is still a collection, migrate it first"
+            )
+
+        operations = []
+        if self.current() is not None:
+            operations.append(
+                models.DeleteAliasOperation(
+                    delete_alias=models.DeleteAlias(alias_name=self.alias)
+                )
+            )
+        operations.append(
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(
+                    collection_name=name, alias_name=self.alias
+                )
+            )
+        )
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+
+    def rollback(self, validated: Iterable[str], version: Optional[int] = None) -> str:
+        """
+        Point the alias at an older validated version, by default the newest
+        one before the live version. Returns the name of that version.
+        """
+        validated = set(validated)
+        versions = [name for name in self.versions() if name in validated]
+        current = self.current()
+
+        if version is not None:
+            target = self.version_name(version)
+            if target not in versions:
+                raise CollectionVersionError(f"No validated version {target}")
+        else:
+            older = versions[: versions.index(current)] if current in versions else []
+            if not older:
+                raise CollectionVersionError("No older version to roll back to")
+            target = older[-1]
+
+        if target != current:
+            self.swap(target)
+        return target
+
+    def collect_garbage(
+        self, validated: Iterable[str], retention: int = COLLECTION_RETENTION
+    ) -> List[str]:
+        """
+        Delete versions beyond the newest `retention` validated ones, and
+        leftovers of builds that never went live. Returns the deleted names.
+        """
+        validated = set(validated)
+        versions = self.versions()
+        kept_versions = [name for name in versions if name in validated]
+        keep = set(kept_versions[-max(retention, 1) :])
+        keep.add(self.current())
+
+        deleted = []
+        for name in versions:
+            if name not in keep:
+                self.client.delete_collection(name)
+                deleted.append(name)
+        return deleted
@@ -0,0 +1,145 @@
+"""
+Context Assembly Module
+
+This module turns retrieved chunks into the context string handed to the model.
+It removes exact and near-duplicate chunks, diversifies the selection with
+maximal marginal relevance (MMR) and keeps the result within a token budget
+derived from the model's context window.
+"""
+
+import dataclasses
+import hashlib
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from embeddings import normalize_text
+
+# Configuration
+MODEL_CONTEXT_WINDOW = int(os.getenv("MODEL_CONTEXT_WINDOW", "4096"))
+# Share of the context window that retrieved chunks may occupy
+CONTEXT_BUDGET_RATIO = float(os.getenv("CONTEXT_BUDGET_RATIO", "0.35"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.95"))
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "10"))
+
+# Rough characters-per-token ratio for English prose with BPE tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate, good enough for budgeting prompts."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut the text to fit `max_tokens` by `estimate_tokens`, at a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[: max(0, max_tokens - 1) * CHARS_PER_TOKEN]
+    head, space, _ = cut.rpartition(" ")
+    return head if space and head else cut
+
+
+def content_hash(text: str) -> str:
+    """Hash of the normalized text, identical for chunks differing only in spacing."""
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class ContextAssembler:
+    """Selects a compact, diverse subset of retrieved chunks."""
+
+    def __init__(
+        self,
+        context_window: int = MODEL_CONTEXT_WINDOW,
+        budget_ratio: float = CONTEXT_BUDGET_RATIO,
+        dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+        mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+    ):
+        self.token_budget = int(context_window * budget_ratio)
+        self.dedup_threshold = dedup_threshold
+        self.mmr_lambda = mmr_lambda
+
+    @staticmethod
+    def _unit_vectors(vectors: Sequence[Optional[Sequence[float]]]) -> np.ndarray:
+        matrix = np.array(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def deduplicate(self, chunks: list) -> list:
+        """Drop exact duplicates by hash and near-duplicates by embedding similarity."""
+        seen_hashes = set()
+        unique = []
+        for chunk in chunks:
+            digest = content_hash(chunk.text)
+            if digest not in seen_hashes:
+                seen_hashes.add(digest)
+                unique.append(chunk)
+
+        if len(unique) < 2 or any(chunk.vector is None for chunk in unique):
+            return unique
+
+        # Chunks arrive best first, so the higher ranked of two near-duplicates wins
+        vectors = self._unit_vectors([chunk.vector for chunk in unique])
+        kept: List[int] = []
+        for index in range(len(unique)):
+            if kept and np.max(vectors[kept] @ vectors[index]) >= self.dedup_threshold:
+                continue
+            kept.append(index)
+        return [unique[index] for index in kept]
+
+    def _mmr_order(self, chunks: list) -> list:
+        """Order chunks by maximal marginal relevance."""
+        if len(chunks) < 2 or any(chunk.vector is None for chunk in chunks):
+            return list(chunks)
+
+        scores = np.array([chunk.score for chunk in chunks], dtype=np.float32)
+        spread = scores.max() - scores.min()
+        relevance = (scores - scores.min()) / spread if spread else np.ones_like(scores)
+        similarity = self._unit_vectors([chunk.vector for chunk in chunks])
+        similarity = similarity @ similarity.T
+
+        remaining = list(range(len(chunks)))
+        selected: List[int] = []
+        while remaining:
+            if selected:
+                redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining), dtype=np.float32)
+            mmr = (
+                self.mmr_lambda * relevance[remaining]
+                - (1 - self.mmr_lambda) * redundancy
+            )
+            best = remaining[int(np.argmax(mmr))]
+            selected.append(best)
+            remaining.remove(best)
+        return [chunks[index] for index in selected]
+
+    def select(self, chunks: list, max_chunks: int) -> list:
+        """
+        Deduplicate, diversify and fit the chunks into the token budget. The
+        first chunk is always kept, truncated if it alone exceeds the budget.
+        """
+        selected, used_tokens = [], 0
+        for chunk in self._mmr_order(self.deduplicate(chunks)):
+            if len(selected) >= max_chunks:
+                break
+            tokens = estimate_tokens(chunk.text)
+            if used_tokens + tokens > self.token_budget:
+                if selected:
+                    continue
+                # Never leave the model without context when retrieval found
+                # something: keep the best chunk, cut to the budget
+                chunk = dataclasses.replace(
+                    chunk, text=truncate_to_tokens(chunk.text, self.token_budget)
+                )
+                tokens = estimate_tokens(chunk.text)
+            selected.append(chunk)
+            used_tokens += tokens
+        return selected
+
+    def assemble(self, chunks: list, max_chunks: int) -> str:
+        """Build the context string handed to the model."""
+        return "\n".join(f"\n{chunk.text}\n" for chunk in self.select(chunks, max_chunks))
@@ -0,0 +1,199 @@
+"""
+Conversation Memory Module
+
+This module builds the message history the agents see for a chat session. The
+most recent turns are sent verbatim within a token budget, and older turns are
+folded into a rolling summary stored on the session. Summaries are computed in
+background tasks, so the work per question stays the same however long the
+conversation gets.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    UserPromptPart,
+)
+
+import system_prompts
+from chat_history import ChatHistoryManager, ChatMessage
+from context_builder import CHARS_PER_TOKEN, MODEL_CONTEXT_WINDOW, estimate_tokens
+
+# Configuration
+# Turns (a question and its answer) always kept verbatim when the budget allows
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "4"))
+# Turns that pile up beyond the recent ones before they are summarized
+MEMORY_SUMMARY_BATCH_TURNS = int(os.getenv("MEMORY_SUMMARY_BATCH_TURNS", "2"))
+# Share of the context window that the history, summary included, may occupy
+MEMORY_BUDGET_RATIO = float(os.getenv("MEMORY_BUDGET_RATIO", "0.25"))
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "256"))
+# Messages read per summarization call
+MEMORY_SUMMARY_CHUNK = 20
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def to_model_messages(summary: str, messages: List[ChatMessage]) -> List[ModelMessage]:
+    """Convert a summary and stored messages to Pydantic AI message history."""
+    history: List[ModelMessage] = []
+    if summary:
+        history.append(
+            ModelRequest(parts=[SystemPromptPart(content=SUMMARY_PREFIX + summary)])
+        )
+    for msg in messages:
+        if msg.is_user:
+            history.append(ModelRequest(parts=[UserPromptPart(content=msg.content)]))
+        else:
+            history.append(ModelResponse(parts=[TextPart(content=msg.content)]))
+    return history
+
+
+def transcript_line(message: ChatMessage) -> str:
+    speaker = "User" if message.is_user else "Assistant"
+    return f"{speaker}: {message.content}"
+
+
+class ConversationMemory:
+    """Recent turns verbatim plus a rolling summary kept up to date off-request."""
+
+    def __init__(
+        self,
+        history: ChatHistoryManager,
+        summary_agent: Agent,
+        recent_turns: int = MEMORY_RECENT_TURNS,
+        summary_batch_turns: int = MEMORY_SUMMARY_BATCH_TURNS,
+        token_budget: int = int(MODEL_CONTEXT_WINDOW * MEMORY_BUDGET_RATIO),
+        summary_max_tokens: int = MEMORY_SUMMARY_MAX_TOKENS,
+    ):
+        self.history = history
+        self.summary_agent = summary_agent
+        self.recent_messages = 2 * recent_turns
+        self.summary_batch = 2 * summary_batch_turns
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        # Summary input may use the context window minus prompt and output
+        self.summary_input_budget = MODEL_CONTEXT_WINDOW // 2
+        self.refreshes = 0
+        self.failures = 0
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def load(self, session_id: Optional[str], user_id: str) -> List[ModelMessage]:
+        """Message history for the next question of a session."""
+        if not session_id:
+            return []
+
+        page = await self.history.get_session_messages(
+            session_id, user_id, limit=self.recent_messages + self.summary_batch
+        )
+        if page is None:
+            return []
+
+        unsummarized = page.total - page.summarized_until
+        if unsummarized >= self.recent_messages + self.summary_batch:
+            self.schedule_refresh(
+                session_id,
+                user_id,
+                page.summary,
+                page.summarized_until,
+                page.total - self.recent_messages,
+            )
+
+        budget = self.token_budget
+        if page.summary:
+            budget -= estimate_tokens(page.summary)
+        recent, used = [], 0
+        for message in reversed(page.messages):
+            if message.seq is not None and message.seq < page.summarized_until:
+                break
+            tokens = estimate_tokens(message.content)
+            if used + tokens > budget:
+                break
+            recent.append(message)
+            used += tokens
+        recent.reverse()
+        # Start on a question rather than on the answer to a dropped one
+        while recent and not recent[0].is_user:
+            recent.pop(0)
+
+        return to_model_messages(page.summary, recent)
+
+    def schedule_refresh(
+        self,
+        session_id: str,
+        user_id: str,
+        summary: str,
+        summarized_until: int,
+        target: int,
+    ) -> None:
+        """Fold the messages before seq `target` into the summary in the background."""
+        if session_id in self._tasks:
+            return
+        task = asyncio.create_task(
+            self.refresh(session_id, user_id, summary, summarized_until, target)
+        )
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda t: self._tasks.pop(session_id, None))
+
+    async def refresh(
+        self,
+        session_id: str,
+        user_id: str,
+        summary: str,
+        summarized_until: int,
+        target: int,
+    ) -> None:
+        try:
+            while summarized_until < target:
+                end = min(target, summarized_until + MEMORY_SUMMARY_CHUNK)
+                messages = await self.history.get_message_range(
+                    session_id, user_id, summarized_until, end
+                )
+                lines, used = [], estimate_tokens(summary)
+                for message in messages:
+                    line = transcript_line(message)
+                    tokens = estimate_tokens(line)
+                    if lines and used + tokens > self.summary_input_budget:
+                        end = message.seq
+                        break
+                    lines.append(line[: self.summary_input_budget * CHARS_PER_TOKEN])
+                    used += tokens
+
+                if lines:
+                    summary = await self.summarize(summary, lines)
+                if not await self.history.update_conversation_summary(
+                    session_id, user_id, summary, end
+                ):
+                    # Deleted, or summarized further by another worker
+                    return
+                summarized_until = end
+            self.refreshes += 1
+        except Exception as e:
+            self.failures += 1
+            print(f"Summarizing session {session_id} failed: {e}", flush=True)
+
+    async def summarize(self, summary: str, lines: List[str]) -> str:
+        prompt = system_prompts.SUMMARY_USER_PROMPT_TEMPLATE.format(
+            summary=summary or "None yet.", transcript="\n\n".join(lines)
+        )
+        result = await self.summary_agent.run(prompt)
+        return result.output.strip()[: self.summary_max_tokens * CHARS_PER_TOKEN]
+
+    def stats(self) -> dict:
+        return {
+            "refreshing": len(self._tasks),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+    async def shutdown(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,144 @@
+"""
+Embedding Service Module
+
+This module owns the fastembed dense and sparse models used for retrieval and
+runs every embedding call on a bounded thread pool, so CPU-heavy inference never
+blocks the event loop.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from fastembed import SparseTextEmbedding, TextEmbedding
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+from qdrant_client import models
+
+# Configuration
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SPARSE_MODEL = os.getenv("SPARSE_MODEL", "Qdrant/bm25")
+# Empty string disables the cross-encoder rerank stage
+RERANK_MODEL = os.getenv("RERANK_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2")
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "2"))
+
+
+def dense_vector_name(model_name: str) -> str:
+    """Name of the dense vector field, matching qdrant-client's fastembed naming."""
+    return f"fast-{model_name.split('/')[-1].lower()}"
+
+
+def sparse_vector_name(model_name: str) -> str:
+    """Name of the sparse vector field, matching qdrant-client's fastembed naming."""
+    return f"fast-sparse-{model_name.split('/')[-1].lower()}"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivial whitespace and case changes share a cache key."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingService:
+    """Loads the embedding models once and embeds text off the event loop."""
+
+    def __init__(
+        self,
+        embedding_model: str = EMBEDDING_MODEL,
+        sparse_model: str = SPARSE_MODEL,
+        rerank_model: str = RERANK_MODEL,
+        max_workers: int = EMBEDDING_WORKERS,
+    ):
+        self.embedding_model_name = embedding_model
+        self.sparse_model_name = sparse_model
+        self.rerank_model_name = rerank_model
+        self.dense_vector_name = dense_vector_name(embedding_model)
+        self.sparse_vector_name = sparse_vector_name(sparse_model)
+
+        try:
+            self.dense_model = TextEmbedding(model_name=embedding_model)
+            self.sparse_model = SparseTextEmbedding(model_name=sparse_model)
+            self.reranker: Optional[TextCrossEncoder] = (
+                TextCrossEncoder(model_name=rerank_model) if rerank_model else None
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to initialize embedding models: {e}") from e
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="embedding"
+        )
+
+    async def _run(self, func, *args):
+        """Run a blocking embedding function on the bounded executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def _embed_query_sync(
+        self, text: str
+    ) -> Tuple[List[float], models.SparseVector]:
+        dense = next(iter(self.dense_model.query_embed(text)))
+        sparse = next(iter(self.sparse_model.query_embed(text)))
+        return dense.tolist(), models.SparseVector(
+            indices=sparse.indices.tolist(), values=sparse.values.tolist()
+        )
+
+    def _embed_dense_sync(self, texts: List[str]) -> np.ndarray:
+        matrix = np.stack(list(self.dense_model.embed(texts)))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    async def embed_dense(self, texts: List[str]) -> np.ndarray:
+        """Embed documents with the dense model, one unit-length row per text."""
+        return await self._run(self._embed_dense_sync, texts)
+
+    def _embed_dense_query_sync(self, text: str) -> np.ndarray:
+        vector = next(iter(self.dense_model.query_embed(text)))
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    async def embed_dense_query(self, text: str) -> np.ndarray:
+        """Embed a query with the dense model only, as a unit-length vector."""
+        return await self._run(self._embed_dense_query_sync, text)
+
+    async def embed_query(self, text: str) -> Tuple[List[float], models.SparseVector]:
+        """Embed a search query with both the dense and the sparse model."""
+        return await self._run(self._embed_query_sync, text)
+
+    def _score_passages_sync(
+        self, query: str, passages: List[str]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        query_dense = self._embed_dense_query_sync(query)
+        dense_scores = self._embed_dense_sync(passages) @ query_dense
+
+        query_sparse = next(iter(self.sparse_model.query_embed(query)))
+        query_weights = dict(zip(query_sparse.indices, query_sparse.values))
+        sparse_scores = np.array(
+            [
+                sum(
+                    query_weights.get(index, 0.0) * value
+                    for index, value in zip(doc.indices, doc.values)
+                )
+                for doc in self.sparse_model.embed(passages)
+            ],
+            dtype=np.float32,
+        )
+        return dense_scores, sparse_scores
+
+    async def score_passages(
+        self, query: str, passages: List[str]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Dense cosine and BM25 term-overlap scores of passages against a query."""
+        return await self._run(self._score_passages_sync, query, passages)
+
+    def _rerank_sync(self, query: str, documents: List[str]) -> List[float]:
+        return list(self.reranker.rerank(query, documents))
+
+    async def rerank(self, query: str, documents: List[str]) -> List[float]:
+        """Score documents against the query with the cross-encoder."""
+        if self.reranker is None or not documents:
+            return []
+        return await self._run(self._rerank_sync, query, documents)
+
+    def close(self) -> None:
+        """Shut down the embedding thread pool."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,135 @@
+"""
+Index Profiles Module
+
+This module defines named vector index profiles that trade memory for latency
+and recall. A profile sets the storage of the dense vectors (RAM or on-disk
+mmap), their quantization, the HNSW graph parameters used when a collection is
+created, and the matching search-time parameters used by retrieval.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from qdrant_client import models
+
+# Configuration
+INDEX_PROFILE = os.getenv("INDEX_PROFILE", "default")
+
+
+@dataclass(frozen=True)
+class IndexProfile:
+    """Storage, quantization and HNSW settings of a collection."""
+
+    name: str
+    # "scalar" (int8), "binary" (1 bit per dimension) or None
+    quantization: Optional[str] = None
+    # Keep the original vectors in mmapped files instead of RAM
+    on_disk: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    # Search-time beam width, None uses the Qdrant default
+    search_ef: Optional[int] = None
+    # Candidates fetched with quantized vectors per requested result
+    oversampling: float = 1.0
+    # Rescore quantized candidates with the original vectors
+    rescore: bool = True
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=True)
+            )
+        return None
+
+    def vector_params(self, size: int) -> models.VectorParams:
+        """Dense vector configuration of a new collection."""
+        return models.VectorParams(
+            size=size,
+            distance=models.Distance.COSINE,
+            on_disk=self.on_disk,
+            hnsw_config=models.HnswConfigDiff(
+                m=self.hnsw_m,
+                ef_construct=self.hnsw_ef_construct,
+                on_disk=self.hnsw_on_disk,
+            ),
+            quantization_config=self.quantization_config(),
+        )
+
+    def sparse_vector_params(self) -> models.SparseVectorParams:
+        return models.SparseVectorParams(
+            index=models.SparseIndexParams(on_disk=self.on_disk),
+            modifier=models.Modifier.IDF,
+        )
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        """Search parameters of dense queries, None when the defaults apply."""
+        quantization = None
+        if self.quantization is not None:
+            quantization = models.QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+        if self.search_ef is None and quantization is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.search_ef, quantization=quantization)
+
+    def estimate_memory_bytes(self, points: int, dimensions: int) -> int:
+        """Rough RAM needed for the dense vectors and their HNSW graph."""
+        memory = 0
+        if not self.on_disk:
+            memory += points * dimensions * 4
+        if self.quantization == "scalar":
+            memory += points * dimensions
+        elif self.quantization == "binary":
+            memory += points * (dimensions + 7) // 8
+        if not self.hnsw_on_disk:
+            # Layer 0 holds up to 2 * m links of 4 bytes per point
+            memory += points * self.hnsw_m * 2 * 4
+        return memory
+
+
+PROFILES: Dict[str, IndexProfile] = {
+    profile.name: profile
+    for profile in (
+        # Full float32 vectors in RAM, Qdrant defaults
+        IndexProfile(name="default"),
+        # Denser graph and wider search for the best recall
+        IndexProfile(
+            name="accurate", hnsw_m=32, hnsw_ef_construct=256, search_ef=256
+        ),
+        # int8 vectors in RAM, originals on disk for rescoring
+        IndexProfile(
+            name="balanced",
+            quantization="scalar",
+            on_disk=True,
+            search_ef=128,
+            oversampling=2.0,
+        ),
+        # 1 bit per dimension in RAM, everything else on disk
+        IndexProfile(
+            name="compact",
+            quantization="binary",
+            on_disk=True,
+            hnsw_on_disk=True,
+            hnsw_ef_construct=200,
+            search_ef=128,
+            oversampling=3.0,
+        ),
+    )
+}
+
+
+def get_profile(name: str = INDEX_PROFILE) -> IndexProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown index profile {name!r}, expected one of {', '.join(PROFILES)}"
+        ) from None
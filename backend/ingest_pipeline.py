@@ -0,0 +1,276 @@
+"""
+Indexing Pipeline Module
+
+This module embeds and uploads chunks as a streaming pipeline instead of three
+sequential phases. Chunks flow from the producer into a bounded queue, batches
+are embedded with the dense and sparse models in parallel worker processes, and
+embedded batches are upserted to Qdrant concurrently. At most a fixed number of
+batches is in flight at any stage, which keeps peak memory bounded.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from qdrant_client import QdrantClient, models
+from qdrant_client.local.qdrant_local import QdrantLocal
+
+from embeddings import (
+    EMBEDDING_MODEL,
+    SPARSE_MODEL,
+    dense_vector_name,
+    sparse_vector_name,
+)
+from index_profiles import IndexProfile, get_profile
+
+# Configuration
+INGEST_BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
+INGEST_EMBEDDING_WORKERS = int(
+    os.getenv("INGEST_EMBEDDING_WORKERS", str(max(1, (os.cpu_count() or 2) - 1)))
+)
+INGEST_UPSERT_PARALLELISM = int(os.getenv("INGEST_UPSERT_PARALLELISM", "4"))
+# Batches that may wait between the chunker and the embedding stage
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+
+# Sentinel closing the chunk queue
+_END = object()
+
+# Models of an embedding worker process, loaded once per process
+_worker_models = None
+
+
+def _init_embedding_worker(embedding_model: str, sparse_model: str) -> None:
+    global _worker_models
+    from fastembed import SparseTextEmbedding, TextEmbedding
+
+    # One thread per process, the pool itself provides the parallelism
+    _worker_models = (
+        TextEmbedding(model_name=embedding_model, threads=1),
+        SparseTextEmbedding(model_name=sparse_model, threads=1),
+    )
+
+
+def _embed_batch(texts: List[str]) -> Tuple[list, list]:
+    dense_model, sparse_model = _worker_models
+    dense = [vector.tolist() for vector in dense_model.embed(texts, batch_size=len(texts))]
+    sparse = [
+        (vector.indices.tolist(), vector.values.tolist())
+        for vector in sparse_model.embed(texts, batch_size=len(texts))
+    ]
+    return dense, sparse
+
+
+@dataclass
+class ChunkRecord:
+    """A chunk to index: its point ID, text and payload metadata."""
+
+    id: str
+    text: str
+    metadata: dict
+
+
+def _is_local(client: QdrantClient) -> bool:
+    """Whether the client runs Qdrant in-process (":memory:" or a path)."""
+    return isinstance(getattr(client, "_client", None), QdrantLocal)
+
+
+class IndexingPipeline:
+    """
+    Streams chunks through parallel embedding and concurrent upserts.
+
+    Local Qdrant is not thread-safe, so upserts to it run one at a time.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        embedding_model: str = EMBEDDING_MODEL,
+        sparse_model: str = SPARSE_MODEL,
+        batch_size: int = INGEST_BATCH_SIZE,
+        embedding_workers: int = INGEST_EMBEDDING_WORKERS,
+        upsert_parallelism: int = INGEST_UPSERT_PARALLELISM,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        profile: Optional[IndexProfile] = None,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.embedding_model = embedding_model
+        self.sparse_model = sparse_model
+        self.batch_size = batch_size
+        self.embedding_workers = embedding_workers
+        self.upsert_parallelism = 1 if _is_local(client) else upsert_parallelism
+        self.queue_size = queue_size
+        self.profile = profile or get_profile()
+        self.dense_vector_name = dense_vector_name(embedding_model)
+        self.sparse_vector_name = sparse_vector_name(sparse_model)
+
+    def vector_size(self) -> int:
+        from fastembed import TextEmbedding
+
+        model = TextEmbedding(model_name=self.embedding_model)
+        return len(next(iter(model.embed(["dimension probe"]))))
+
+    def ensure_collection(self) -> None:
+        """
+        Create the collection with the vector layout the retrieval side expects
+        and the storage and HNSW settings of the index profile.
+        """
+        if self.client.collection_exists(self.collection_name):
+            return
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config={
+                self.dense_vector_name: self.profile.vector_params(self.vector_size())
+            },
+            sparse_vectors_config={
+                self.sparse_vector_name: self.profile.sparse_vector_params()
+            },
+        )
+
+    def _produce(
+        self, chunks: Iterable[ChunkRecord], batches: queue.Queue, stop: threading.Event
+    ) -> None:
+        """Group chunks into batches; blocks while the queue is full."""
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.2)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            batch: List[ChunkRecord] = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch:
+                put(batch)
+        except Exception as e:
+            put(e)
+        finally:
+            put(_END)
+
+    def _upsert(self, batch: List[ChunkRecord], embeddings: Tuple[list, list]) -> int:
+        dense, sparse = embeddings
+        points = [
+            models.PointStruct(
+                id=chunk.id,
+                vector={
+                    self.dense_vector_name: dense_vector,
+                    self.sparse_vector_name: models.SparseVector(
+                        indices=indices, values=values
+                    ),
+                },
+                payload={"document": chunk.text, **chunk.metadata},
+            )
+            for chunk, dense_vector, (indices, values) in zip(batch, dense, sparse)
+        ]
+        self.client.upsert(
+            collection_name=self.collection_name, points=points, wait=True
+        )
+        return len(points)
+
+    def run(
+        self,
+        chunks: Iterable[ChunkRecord],
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        wait_for_workers: bool = False,
+    ) -> int:
+        """
+        Index the chunks. `on_progress(chunks_embedded, points_upserted)` is
+        called as batches complete; an exception it raises aborts the run.
+        With `wait_for_workers` the embedding processes have exited when this
+        returns, instead of being left to shut down in the background.
+        Returns the number of points upserted.
+        """
+        self.ensure_collection()
+
+        batches: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(chunks, batches, stop), daemon=True
+        )
+        embed_pool = ProcessPoolExecutor(
+            max_workers=self.embedding_workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_embedding_worker,
+            initargs=(self.embedding_model, self.sparse_model),
+        )
+        upsert_pool = ThreadPoolExecutor(max_workers=self.upsert_parallelism)
+
+        embedding: deque = deque()
+        upserting: set = set()
+        embedded = upserted = 0
+
+        def report() -> None:
+            if on_progress is not None:
+                on_progress(embedded, upserted)
+
+        def collect_upserts(block: bool) -> None:
+            nonlocal upserted
+            if not upserting:
+                return
+            done, _ = wait(
+                upserting, timeout=None if block else 0, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                upserting.discard(future)
+                upserted += future.result()
+            if done:
+                report()
+
+        def hand_over_embedding() -> None:
+            """Pass the oldest embedded batch on to the upsert stage."""
+            nonlocal embedded
+            batch, future = embedding.popleft()
+            vectors = future.result()
+            embedded += len(batch)
+            report()
+            while len(upserting) >= self.upsert_parallelism:
+                collect_upserts(block=True)
+            upserting.add(upsert_pool.submit(self._upsert, batch, vectors))
+
+        producer.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                texts = [chunk.text for chunk in item]
+                embedding.append((item, embed_pool.submit(_embed_batch, texts)))
+                # Keep every embedding worker busy with one batch queued behind it
+                while len(embedding) >= 2 * self.embedding_workers:
+                    hand_over_embedding()
+                collect_upserts(block=False)
+
+            while embedding:
+                hand_over_embedding()
+            while upserting:
+                collect_upserts(block=True)
+        finally:
+            stop.set()
+            embed_pool.shutdown(wait=wait_for_workers, cancel_futures=True)
+            upsert_pool.shutdown(wait=True, cancel_futures=True)
+            producer.join(timeout=1)
+
+        return upserted
@@ -0,0 +1,520 @@
+"""
+Ingestion Module
+
+This module builds the D&D knowledge base from the configured PDF sources.
+Every run builds a new collection version that goes live through an alias swap
+once it is validated. Ingestion is incremental: point IDs are derived from the
+source and the chunk content, and a manifest records which chunks each version
+holds per source, so unchanged chunks are copied from the live version and only
+new ones are embedded. Ingestion runs as a background job in a separate worker
+process, so converting, chunking and embedding the handbook never blocks the
+API server's event loop. Jobs report their progress, can be cancelled, and only
+one of them runs at a time.
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Set
+from urllib.parse import urlparse
+
+import httpx
+from pydantic import BaseModel
+
+from collection_versions import CollectionVersions
+from index_profiles import IndexProfile, get_profile
+from ingest_pipeline import ChunkRecord, IndexingPipeline
+from main import COLLECTION_NAME, QDRANT_URL
+
+# Configuration
+DND_HANDBOOK_URL = os.getenv(
+    "DND_HANDBOOK_URL",
+    "https://media.wizards.com/2014/downloads/dnd/PlayerDnDBasicRules_v0.2_PrintFriendly.pdf",
+)
+# Comma separated PDF URLs, PDF files or directories of PDF files
+DND_SOURCES = os.getenv("DND_SOURCES", DND_HANDBOOK_URL)
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "ingest_manifest.json")
+# Manifest entry recording the index profile each version was built with
+MANIFEST_PROFILES_KEY = "index_profiles"
+INGEST_DOWNLOAD_DIR = os.getenv("INGEST_DOWNLOAD_DIR", "downloads")
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
+# Seconds a cancelled job gets to stop on its own before it is terminated
+INGESTION_CANCEL_GRACE = float(os.getenv("INGESTION_CANCEL_GRACE", "10"))
+INGESTION_JOB_HISTORY = int(os.getenv("INGESTION_JOB_HISTORY", "20"))
+
+
+def utc_now() -> datetime:
+    """Helper function to get current UTC datetime."""
+    return datetime.now(timezone.utc)
+
+
+class IngestionCancelled(Exception):
+    """Raised inside the worker when the job was cancelled."""
+
+
+class IngestionAlreadyRunning(Exception):
+    """Raised when a job is started while another one is still running."""
+
+
+class IngestionJob(BaseModel):
+    """State and progress of an ingestion job."""
+
+    id: str
+    status: str = "queued"
+    phase: str = "queued"
+    sources_total: int = 0
+    sources_unchanged: int = 0
+    pages_converted: int = 0
+    chunks_embedded: int = 0
+    points_upserted: int = 0
+    points_copied: int = 0
+    points_deleted: int = 0
+    document_count: int = 0
+    collection: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("queued", "running", "cancelling")
+
+
+def resolve_sources(spec: str = DND_SOURCES) -> List[str]:
+    """Expand the configured sources; directories contribute their PDF files."""
+    sources = []
+    for entry in (part.strip() for part in spec.split(",")):
+        if not entry:
+            continue
+        if os.path.isdir(entry):
+            sources.extend(
+                sorted(
+                    os.path.join(entry, name)
+                    for name in os.listdir(entry)
+                    if name.lower().endswith(".pdf")
+                )
+            )
+        else:
+            sources.append(entry)
+    return sources
+
+
+def fetch_source(source: str) -> str:
+    """Local path of a source, downloading it first if it is a URL."""
+    if urlparse(source).scheme not in ("http", "https"):
+        return source
+
+    os.makedirs(INGEST_DOWNLOAD_DIR, exist_ok=True)
+    name = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(INGEST_DOWNLOAD_DIR, f"{name}.pdf")
+    with httpx.stream("GET", source, follow_redirects=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(f"{path}.part", "wb") as f:
+            for data in response.iter_bytes():
+                f.write(data)
+    os.replace(f"{path}.part", path)
+    return path
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Deterministic point ID, so re-ingesting a chunk overwrites instead of duplicating."""
+    digest = hashlib.sha256(f"{source}\n{text}".encode("utf-8")).hexdigest()
+    return str(uuid.UUID(digest[:32]))
+
+
+def load_manifest(path: str = INGEST_MANIFEST_PATH) -> dict:
+    """
+    Chunk IDs and content hash of every ingested source per collection, and the
+    index profile of every collection.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, path: str = INGEST_MANIFEST_PATH) -> None:
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def ingest_sources(
+    report: Callable[..., None], is_cancelled: Callable[[], bool]
+) -> int:
+    """
+    Build a new version of the collection from the configured sources and put
+    it live. Unchanged chunks are copied from the live version, only new chunks
+    are embedded. Nothing is built when no source changed. Returns the number
+    of chunks in the live collection.
+    """
+    # Heavy imports stay out of the API process
+    from docling.chunking import HybridChunker
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter
+    from qdrant_client import QdrantClient
+
+    progress = {
+        "sources_total": 0,
+        "sources_unchanged": 0,
+        "pages_converted": 0,
+        "chunks_embedded": 0,
+        "points_upserted": 0,
+        "points_copied": 0,
+        "points_deleted": 0,
+    }
+
+    def checkpoint(**update) -> None:
+        if is_cancelled():
+            raise IngestionCancelled()
+        progress.update((k, v) for k, v in update.items() if k in progress)
+        report(**{**update, **progress})
+
+    db_client = QdrantClient(location=QDRANT_URL)
+    versions = CollectionVersions(db_client, COLLECTION_NAME)
+    manifest = load_manifest()
+    if versions.is_legacy():
+        # One-time migration of a collection built before versioning; it
+        # becomes the first version, so it can be rolled back to
+        checkpoint(phase="migrating")
+        migrated = versions.migrate_legacy()
+        print(f"Moved collection {COLLECTION_NAME} to {migrated}", flush=True)
+        manifest[migrated] = manifest.pop(COLLECTION_NAME, {})
+        save_manifest(manifest)
+    current = versions.current()
+    previous = manifest.get(current, {}) if current else {}
+
+    sources = resolve_sources()
+    checkpoint(phase="fetching", sources_total=len(sources))
+    paths, hashes = {}, {}
+    for source in sources:
+        paths[source] = fetch_source(source)
+        hashes[source] = file_hash(paths[source])
+        checkpoint()
+
+    unchanged = {
+        source
+        for source in sources
+        if source in previous and previous[source]["content_hash"] == hashes[source]
+    }
+    if unchanged == previous.keys() == set(sources):
+        checkpoint(sources_unchanged=len(unchanged), collection=current)
+        return sum(len(entry["chunk_ids"]) for entry in previous.values())
+
+    target = versions.next_name()
+    pipeline = IndexingPipeline(db_client, target, batch_size=BATCH_SIZE)
+    pipeline.ensure_collection()
+    checkpoint(collection=target)
+    entries = {}
+    doc_converter = None
+
+    try:
+        for source in sources:
+            entry = previous.get(source)
+            if source in unchanged:
+                copied = versions.copy_points(current, target, entry["chunk_ids"])
+                entries[source] = entry
+                checkpoint(
+                    sources_unchanged=progress["sources_unchanged"] + 1,
+                    points_copied=progress["points_copied"] + copied,
+                )
+                continue
+
+            doc_converter = doc_converter or DocumentConverter(
+                allowed_formats=[InputFormat.PDF]
+            )
+            checkpoint(phase="converting")
+            result = doc_converter.convert(paths[source])
+            checkpoint(
+                pages_converted=progress["pages_converted"]
+                + len(result.document.pages),
+            )
+
+            existing = set(entry["chunk_ids"]) if entry else set()
+            # Ordered set of every chunk of the source, filled while chunks stream
+            chunk_ids: Dict[str, None] = {}
+
+            def new_chunks() -> Iterator[ChunkRecord]:
+                for chunk in HybridChunker().chunk(result.document):
+                    point_id = chunk_id(source, chunk.text)
+                    if point_id in chunk_ids:
+                        continue
+                    chunk_ids[point_id] = None
+                    if point_id in existing:
+                        continue
+                    metadata = chunk.meta.export_json_dict()
+                    metadata["source"] = source
+                    yield ChunkRecord(id=point_id, text=chunk.text, metadata=metadata)
+
+            # Chunking, embedding and upserting overlap in the pipeline
+            checkpoint(phase="indexing")
+            embedded_before = progress["chunks_embedded"]
+            upserted_before = progress["points_upserted"]
+            pipeline.run(
+                new_chunks(),
+                on_progress=lambda embedded, upserted: checkpoint(
+                    chunks_embedded=embedded_before + embedded,
+                    points_upserted=upserted_before + upserted,
+                ),
+            )
+
+            kept = [point_id for point_id in chunk_ids if point_id in existing]
+            copied = versions.copy_points(current, target, kept) if kept else 0
+            entries[source] = {
+                "content_hash": hashes[source],
+                "chunk_ids": list(chunk_ids),
+            }
+            checkpoint(
+                points_copied=progress["points_copied"] + copied,
+                points_deleted=progress["points_deleted"] + len(existing) - len(kept),
+            )
+
+        removed = sum(
+            len(entry["chunk_ids"])
+            for source, entry in previous.items()
+            if source not in entries
+        )
+        document_count = sum(len(entry["chunk_ids"]) for entry in entries.values())
+        checkpoint(
+            phase="validating", points_deleted=progress["points_deleted"] + removed
+        )
+        versions.validate(target, document_count)
+        checkpoint(phase="swapping")
+    except BaseException:
+        # A version that never went live is useless, even for incremental reuse
+        db_client.delete_collection(target)
+        raise
+
+    # Past the swap the job can no longer be cancelled
+    versions.swap(target)
+    print(f"Collection alias {COLLECTION_NAME} now points at {target}", flush=True)
+    manifest[target] = entries
+    manifest.setdefault(MANIFEST_PROFILES_KEY, {})[target] = pipeline.profile.name
+    for name in versions.collect_garbage(manifest):
+        manifest.pop(name, None)
+        manifest[MANIFEST_PROFILES_KEY].pop(name, None)
+        print(f"Deleted old collection version {name}", flush=True)
+    save_manifest(manifest)
+
+    return document_count
+
+
+def rollback_collection(version: Optional[int] = None) -> str:
+    """Point the collection alias back at an older validated version."""
+    from qdrant_client import QdrantClient
+
+    db_client = QdrantClient(location=QDRANT_URL)
+    try:
+        versions = CollectionVersions(db_client, COLLECTION_NAME)
+        return versions.rollback(load_manifest(), version)
+    finally:
+        db_client.close()
+
+
+def index_profile_of(version: Optional[str]) -> IndexProfile:
+    """
+    Index profile a collection version was built with. Versions built before
+    profiles were recorded use the configured profile.
+    """
+    name = load_manifest().get(MANIFEST_PROFILES_KEY, {}).get(version)
+    try:
+        return get_profile(name) if name else get_profile()
+    except ValueError as e:
+        print(f"{e}, searching {version} with the configured profile", flush=True)
+        return get_profile()
+
+
+def describe_collection_versions() -> dict:
+    """Live version and validated versions available for rollback."""
+    from qdrant_client import QdrantClient
+
+    db_client = QdrantClient(location=QDRANT_URL)
+    try:
+        versions = CollectionVersions(db_client, COLLECTION_NAME)
+        manifest = load_manifest()
+        return {
+            "alias": COLLECTION_NAME,
+            "current": versions.current(),
+            "versions": [name for name in versions.versions() if name in manifest],
+        }
+    finally:
+        db_client.close()
+
+
+def _cancel_on_sigterm(signum, frame) -> None:
+    # A second SIGTERM kills the worker right away
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    raise IngestionCancelled()
+
+
+def _ingestion_worker(events: multiprocessing.Queue, cancel_event) -> None:
+    """Entry point of the worker process; reports everything through `events`."""
+    # Lead a process group, so terminating the job reaches the embedding
+    # processes too, and unwind like a cancellation when terminated, so the
+    # embedding pool is shut down and the unfinished version deleted
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    signal.signal(signal.SIGTERM, _cancel_on_sigterm)
+
+    def report(**progress) -> None:
+        events.put(progress)
+
+    try:
+        document_count = ingest_sources(report, cancel_event.is_set)
+        events.put(
+            {"status": "completed", "phase": "done", "document_count": document_count}
+        )
+    except IngestionCancelled:
+        events.put({"status": "cancelled", "phase": "done"})
+    except Exception as e:
+        if cancel_event.is_set():
+            # Killed embedding processes break the pool of a terminated job
+            events.put({"status": "cancelled", "phase": "done"})
+        else:
+            events.put({"status": "failed", "phase": "done", "error": str(e)})
+
+
+def _terminate(process) -> None:
+    """Terminate the worker together with the embedding processes it started."""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        # No process group yet, or not on POSIX
+        process.terminate()
+
+
+class IngestionJobManager:
+    """Runs ingestion jobs in a worker process, one at a time."""
+
+    def __init__(self):
+        self.jobs: Dict[str, IngestionJob] = {}
+        # Called with every job that finished, whatever its outcome: a job
+        # that failed or was cancelled may have put a new version live too
+        self.on_finished: List[Callable[[IngestionJob], Awaitable]] = []
+        self._context = multiprocessing.get_context("spawn")
+        self._process: Optional[multiprocessing.Process] = None
+        self._cancel_event = None
+        self._monitor_task: Optional[asyncio.Task] = None
+        # The loop keeps only weak references to tasks, so hold on to these
+        self._grace_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def active_job(self) -> Optional[IngestionJob]:
+        return next((job for job in self.jobs.values() if job.is_active), None)
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job for job in self.jobs.values() if not job.is_active]
+        for job in finished[: max(0, len(finished) - INGESTION_JOB_HISTORY)]:
+            del self.jobs[job.id]
+
+    def start(self) -> IngestionJob:
+        """Start a new job, unless one is already running."""
+        if self.active_job is not None:
+            raise IngestionAlreadyRunning(self.active_job.id)
+
+        job = IngestionJob(id=uuid.uuid4().hex, created_at=utc_now())
+        self._forget_old_jobs()
+        self.jobs[job.id] = job
+
+        events = self._context.Queue()
+        self._cancel_event = self._context.Event()
+        self._process = self._context.Process(
+            target=_ingestion_worker,
+            args=(events, self._cancel_event),
+            # Not a daemon: the worker starts its own embedding processes
+            daemon=False,
+        )
+        self._process.start()
+        job.status = "running"
+        self._monitor_task = asyncio.create_task(
+            self._monitor(job, self._process, events)
+        )
+        return job
+
+    async def _monitor(self, job: IngestionJob, process, events) -> None:
+        """Apply the worker's progress events to the job until it exits."""
+        while True:
+            try:
+                event = await asyncio.to_thread(events.get, True, 0.5)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                if job.is_active:
+                    # The worker died or was terminated without a final event
+                    job.status = (
+                        "cancelled" if job.status == "cancelling" else "failed"
+                    )
+                    job.error = job.error or f"Worker exited with code {process.exitcode}"
+                break
+
+            status = event.get("status")
+            for key, value in event.items():
+                setattr(job, key, value)
+            if status in ("completed", "failed", "cancelled"):
+                break
+
+        job.finished_at = utc_now()
+        process.join(timeout=1)
+        for callback in self.on_finished:
+            try:
+                await callback(job)
+            except Exception as e:
+                print(f"Handling the end of job {job.id} failed: {e}", flush=True)
+
+    async def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """Ask the worker to stop, terminating it after a grace period."""
+        job = self.jobs.get(job_id)
+        if job is None or not job.is_active:
+            return job
+
+        job.status = "cancelling"
+        self._cancel_event.set()
+        process = self._process
+
+        async def terminate_after_grace() -> None:
+            await asyncio.to_thread(process.join, INGESTION_CANCEL_GRACE)
+            if process.is_alive():
+                _terminate(process)
+
+        task = asyncio.create_task(terminate_after_grace())
+        self._grace_tasks.add(task)
+        task.add_done_callback(self._grace_task_done)
+        return job
+
+    def _grace_task_done(self, task: asyncio.Task) -> None:
+        self._grace_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(
+                f"Terminating the ingestion worker failed: {task.exception()}",
+                flush=True,
+            )
+
+    async def shutdown(self) -> None:
+        """Stop a running worker when the server shuts down."""
+        if self._process is not None and self._process.is_alive():
+            self._cancel_event.set()
+            _terminate(self._process)
+        for task in list(self._grace_tasks):
+            task.cancel()
+        if self._monitor_task is not None:
+            await asyncio.gather(self._monitor_task, return_exceptions=True)
+
+
+ingestion_manager = IngestionJobManager()
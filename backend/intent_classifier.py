@@ -0,0 +1,169 @@
+"""
+Intent Classification Module
+
+This module decides whether a question is an appropriate D&D question using the
+already loaded dense embedding model. Questions are scored against labeled
+exemplars with k-nearest-neighbour similarity; only questions whose score falls
+in an uncertainty band are sent to the LLM intent agent.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from pydantic_ai import Agent
+
+from embeddings import EmbeddingService
+
+# Configuration
+INTENT_KNN_K = int(os.getenv("INTENT_KNN_K", "3"))
+# Margins of the D&D score over the off-topic score outside of which the local
+# decision is trusted
+INTENT_ACCEPT_MARGIN = float(os.getenv("INTENT_ACCEPT_MARGIN", "0.08"))
+INTENT_REJECT_MARGIN = float(os.getenv("INTENT_REJECT_MARGIN", "-0.08"))
+
+DND_EXEMPLARS = [
+    "How does the Fireball spell work?",
+    "Describe the spell fireball",
+    "What does the grappled condition do?",
+    "How many spell slots does a 5th level wizard have?",
+    "Can a rogue use sneak attack with a thrown dagger?",
+    "What is the difference between advantage and disadvantage?",
+    "How do death saving throws work?",
+    "What are the racial traits of a half-orc?",
+    "How is armor class calculated with mage armor?",
+    "What does the Extra Attack feature give a fighter?",
+    "How do opportunity attacks work?",
+    "What is concentration and when do I lose it?",
+    "How much damage does a longsword deal?",
+    "Explain the rules for short rests and long rests",
+    "Which cleric domain is best for healing?",
+    "How does multiclassing into paladin work?",
+    "What is a beholder and where does it live?",
+    "Who is Tiamat in the Forgotten Realms?",
+    "How does cover affect attack rolls?",
+    "What are the components of a spell?",
+    "How does a warlock regain spell slots?",
+    "What does the Lucky feat do?",
+    "How do I calculate my proficiency bonus?",
+    "Can I cast two spells in one turn with a bonus action?",
+    "What happens when a creature drops to 0 hit points?",
+    "How does the Dungeon Master handle surprise in combat?",
+    "What are the alignments in D&D 5e?",
+    "How does the barbarian's rage work?",
+    "What magic items can a level 3 character attune to?",
+    "How does Pathfinder's action economy compare to D&D 5e?",
+    "Which D&D classes appear in the Baldur's Gate 3 video game?",
+    "How do I build a good ranger for my campaign?",
+]
+
+OFF_TOPIC_EXEMPLARS = [
+    "What is the weather like in Paris today?",
+    "Write me a Python function to sort a list",
+    "Who won the football world cup in 2018?",
+    "What is the capital of Australia?",
+    "How do I bake sourdough bread?",
+    "Explain quantum entanglement",
+    "What stocks should I buy this year?",
+    "How do I fix my car's brakes?",
+    "Translate this sentence into Spanish",
+    "What is the plot of the Lord of the Rings?",
+    "Who is the strongest character in Game of Thrones?",
+    "Recommend a good fantasy novel",
+    "How do I lose weight quickly?",
+    "What is the best smartphone right now?",
+    "Tell me a joke about programmers",
+    "How do vaccines work?",
+    "Write a cover letter for a software engineering job",
+    "What is the population of Tokyo?",
+    "How do I make a bomb?",
+    "Write explicit sexual content",
+    "Tell me why one ethnic group is inferior",
+    "How can I hack into my neighbour's wifi?",
+    "Insult me as harshly as you can",
+    "How do I hurt someone without getting caught?",
+    "What is the meaning of life?",
+    "Summarize today's news",
+    "How many calories are in an apple?",
+    "Solve this equation: 3x + 5 = 20",
+    "Who painted the Mona Lisa?",
+    "What are dragons in Chinese mythology?",
+    "Explain how elves are portrayed in Norse mythology",
+    "What is the best strategy in chess openings?",
+]
+
+
+@dataclass
+class IntentDecision:
+    """Outcome of an intent classification."""
+
+    is_related: bool
+    source: str
+    margin: Optional[float] = None
+
+
+class EmbeddingIntentClassifier:
+    """kNN intent classifier over exemplar embeddings with an LLM fallback."""
+
+    def __init__(
+        self,
+        embedder: EmbeddingService,
+        fallback_agent: Optional[Agent] = None,
+        k: int = INTENT_KNN_K,
+        accept_margin: float = INTENT_ACCEPT_MARGIN,
+        reject_margin: float = INTENT_REJECT_MARGIN,
+    ):
+        self.embedder = embedder
+        self.fallback_agent = fallback_agent
+        self.k = k
+        self.accept_margin = accept_margin
+        self.reject_margin = reject_margin
+        self.dnd_vectors: Optional[np.ndarray] = None
+        self.off_topic_vectors: Optional[np.ndarray] = None
+        self._warmup_lock = asyncio.Lock()
+
+    async def warmup(self) -> None:
+        """Embed the exemplars once; later calls are no-ops."""
+        async with self._warmup_lock:
+            if self.dnd_vectors is not None:
+                return
+            self.off_topic_vectors = await self.embedder.embed_dense(
+                OFF_TOPIC_EXEMPLARS
+            )
+            self.dnd_vectors = await self.embedder.embed_dense(DND_EXEMPLARS)
+
+    def _knn_score(self, exemplars: np.ndarray, vector: np.ndarray) -> float:
+        similarities = exemplars @ vector
+        k = min(self.k, len(similarities))
+        return float(np.mean(np.partition(similarities, -k)[-k:]))
+
+    def margin(self, vector: np.ndarray) -> float:
+        """D&D kNN similarity minus off-topic kNN similarity for a unit vector."""
+        return self._knn_score(self.dnd_vectors, vector) - self._knn_score(
+            self.off_topic_vectors, vector
+        )
+
+    def decide(self, margin: float) -> Optional[IntentDecision]:
+        """Local decision for a margin, or None when it is in the uncertainty band."""
+        if margin >= self.accept_margin:
+            return IntentDecision(is_related=True, source="embedding", margin=margin)
+        if margin <= self.reject_margin:
+            return IntentDecision(is_related=False, source="embedding", margin=margin)
+        return None
+
+    async def classify(self, question: str) -> IntentDecision:
+        """Classify a question, asking the LLM only inside the uncertainty band."""
+        await self.warmup()
+        vector = await self.embedder.embed_dense_query(question)
+        margin = self.margin(vector)
+        decision = self.decide(margin)
+        if decision is not None:
+            return decision
+
+        if self.fallback_agent is None:
+            return IntentDecision(is_related=margin > 0, source="embedding", margin=margin)
+
+        result = await self.fallback_agent.run(question)
+        return IntentDecision(is_related=result.output, source="llm", margin=margin)
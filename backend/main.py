@@ -6,59 +6,210 @@ It provides core functionality for retrieving D&D information from a vector data
 """
 
 import os
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Any, List, Optional, Tuple
 
+import httpx
 import system_prompts
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, models
 
+from context_builder import CONTEXT_CANDIDATES, ContextAssembler
+from conversation_memory import MEMORY_SUMMARY_MAX_TOKENS
+from embeddings import EmbeddingService, normalize_text
+from browser_pool import CrawlerPool
+from index_profiles import IndexProfile, get_profile
+from intent_classifier import EmbeddingIntentClassifier
+from passages import PassageSelector
 from web_search import WebSearchTool
 from web_search import SearchResult
 
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/v1")
 MODEL_NAME = os.getenv("MODEL_NAME", "qwen3:1.7b")
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "handbook")
-SPARSE_MODEL = os.getenv("SPARSE_MODEL", "Qdrant/bm25")
-QUERY_LIMIT = int(os.getenv("QUERY_LIMIT", "10"))
+QUERY_LIMIT = int(os.getenv("QUERY_LIMIT", "5"))
+PREFETCH_LIMIT = int(os.getenv("PREFETCH_LIMIT", "40"))
+QUERY_VECTOR_CACHE_SIZE = int(os.getenv("QUERY_VECTOR_CACHE_SIZE", "1024"))
 
 
 @dataclass
 class Deps:
-    client: QdrantClient
+    client: AsyncQdrantClient
+
+
+@dataclass
+class RetrievedChunk:
+    text: str
+    score: float
+    vector: Optional[list[float]] = None
+
+
+class QueryVectorCache:
+    """Bounded LRU of query vectors keyed by model name and normalized text."""
+
+    def __init__(self, max_entries: int = QUERY_VECTOR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[str, str], Any] = OrderedDict()
+
+    def get(self, model_name: str, text: str) -> Optional[Any]:
+        key = (model_name, text)
+        vector = self._entries.get(key)
+        if vector is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return vector
+
+    def put(self, model_name: str, text: str, vector: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (model_name, text)
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
 
 
 class QdrantService:
-    def __init__(self, url: str = QDRANT_URL, embedding_model: str = EMBEDDING_MODEL):
-        self.client = QdrantClient(location=url)
-        try:
-            self.client.set_model(embedding_model)
-            self.client.set_sparse_model(SPARSE_MODEL)
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize Qdrant client: {e}") from e
+    def __init__(
+        self,
+        url: str = QDRANT_URL,
+        embedder: Optional[EmbeddingService] = None,
+        client: Optional[AsyncQdrantClient] = None,
+    ):
+        self.client = client or AsyncQdrantClient(location=url)
+        self.embedder = embedder or EmbeddingService()
+        self.vector_cache = QueryVectorCache()
+        self.use_profile(get_profile())
+
+    def use_profile(self, profile: IndexProfile) -> None:
+        """Search with the HNSW ef and oversampling of the live index profile."""
+        self.profile = profile
+        self.search_params = profile.search_params()
+
+    async def live_collection(self, alias: str) -> Optional[str]:
+        """Physical collection an alias points at, if it is an alias."""
+        for entry in (await self.client.get_aliases()).aliases:
+            if entry.alias_name == alias:
+                return entry.collection_name
+        return None
+
+    async def get_query_vectors(
+        self, query_text: str
+    ) -> Tuple[list[float], models.SparseVector]:
+        """Return the dense and sparse query vectors, embedding them on a cache miss."""
+        text = normalize_text(query_text)
+        dense_model = self.embedder.embedding_model_name
+        sparse_model = self.embedder.sparse_model_name
 
-    def query_documents(
+        dense_vector = self.vector_cache.get(dense_model, text)
+        sparse_vector = self.vector_cache.get(sparse_model, text)
+        if dense_vector is None or sparse_vector is None:
+            dense_vector, sparse_vector = await self.embedder.embed_query(text)
+            self.vector_cache.put(dense_model, text, dense_vector)
+            self.vector_cache.put(sparse_model, text, sparse_vector)
+
+        return dense_vector, sparse_vector
+
+    async def search(
         self, collection_name: str, query_text: str, limit: int = None
-    ) -> list[str]:
+    ) -> list[RetrievedChunk]:
+        """
+        Hybrid search: prefetch dense and sparse candidates, fuse them with RRF
+        in Qdrant, rerank the fused candidates with the cross-encoder and keep
+        the best `limit` chunks.
+        """
         limit = limit or QUERY_LIMIT
-        points = self.client.query(
+        candidate_limit = max(PREFETCH_LIMIT, limit)
+        dense_vector, sparse_vector = await self.get_query_vectors(query_text)
+        response = await self.client.query_points(
             collection_name=collection_name,
-            query_text=query_text,
-            limit=limit,
+            prefetch=[
+                models.Prefetch(
+                    query=dense_vector,
+                    using=self.embedder.dense_vector_name,
+                    limit=candidate_limit,
+                    params=self.search_params,
+                ),
+                models.Prefetch(
+                    query=sparse_vector,
+                    using=self.embedder.sparse_vector_name,
+                    limit=candidate_limit,
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=candidate_limit,
+            with_payload=True,
+            with_vectors=[self.embedder.dense_vector_name],
         )
-        return [f"\n{point.document}\n" for point in points]
+        chunks = [
+            RetrievedChunk(
+                text=point.payload["document"],
+                score=point.score,
+                vector=(point.vector or {}).get(self.embedder.dense_vector_name),
+            )
+            for point in response.points
+        ]
+
+        scores = await self.embedder.rerank(
+            query_text, [chunk.text for chunk in chunks]
+        )
+        if scores:
+            for chunk, score in zip(chunks, scores):
+                chunk.score = score
+            chunks.sort(key=lambda chunk: chunk.score, reverse=True)
+
+        return chunks[:limit]
+
+    async def query_documents(
+        self, collection_name: str, query_text: str, limit: int = None
+    ) -> list[str]:
+        chunks = await self.search(collection_name, query_text, limit)
+        return [f"\n{chunk.text}\n" for chunk in chunks]
+
+    async def close(self) -> None:
+        await self.client.close()
+        self.embedder.close()
 
 
 class AgentFactory:
     def __init__(self, model_name: str = MODEL_NAME, base_url: str = OLLAMA_URL):
+        self.model_name = model_name
+        self.base_url = base_url
         self.model = OpenAIModel(
             model_name=model_name, provider=OpenAIProvider(base_url=base_url)
         )
 
+    async def preload(self) -> None:
+        """Have the model server load the model with a one-token completion."""
+        async with httpx.AsyncClient(timeout=None) as client:
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                json={
+                    "model": self.model_name,
+                    "messages": [{"role": "user", "content": "Hello"}],
+                    "max_tokens": 1,
+                },
+            )
+            response.raise_for_status()
+
     def create_agents(self) -> Tuple[Agent, Agent]:
         main_agent = Agent(
             model=self.model,
@@ -75,15 +226,94 @@ class AgentFactory:
 
         return main_agent, intents_agent
 
+    def create_answer_agent(self) -> Agent:
+        """Agent without tools that answers from research injected into the prompt."""
+        return Agent(
+            model=self.model,
+            deps_type=Deps,
+            output_type=str,
+            system_prompt=system_prompts.EAGER_SYSTEM_PROMPT,
+        )
+
+    def create_summary_agent(
+        self, max_tokens: int = MEMORY_SUMMARY_MAX_TOKENS
+    ) -> Agent:
+        """Agent that folds older conversation turns into a rolling summary."""
+        return Agent(
+            model=self.model,
+            output_type=str,
+            system_prompt=system_prompts.SUMMARY_SYSTEM_PROMPT.format(
+                # About three words fit in four tokens
+                max_words=max_tokens * 3 // 4
+            ),
+        )
+
 
 class DndKnowledgeBase:
     def __init__(self):
         self.qdrant_service = QdrantService()
         self.agent_factory = AgentFactory()
-        self.web_tool = WebSearchTool()
+        self.crawler_pool = CrawlerPool()
+        self.web_tool = WebSearchTool(
+            self.crawler_pool,
+            passage_selector=PassageSelector(self.qdrant_service.embedder),
+        )
+        self.context_assembler = ContextAssembler()
         self.main_agent, self.intents_agent = self.agent_factory.create_agents()
+        self.answer_agent = self.agent_factory.create_answer_agent()
+        self.summary_agent = self.agent_factory.create_summary_agent()
+        self.intent_classifier = EmbeddingIntentClassifier(
+            self.qdrant_service.embedder, fallback_agent=self.intents_agent
+        )
         self._register_tools()
 
+    async def retrieve_context(self, search_query: str) -> str:
+        """Retrieve chunks for the query and assemble them into a compact context."""
+        chunks = await self.qdrant_service.search(
+            COLLECTION_NAME, search_query, limit=max(CONTEXT_CANDIDATES, QUERY_LIMIT)
+        )
+        return self.context_assembler.assemble(chunks, max_chunks=QUERY_LIMIT)
+
+    async def prefetch_context(self, question: str) -> str:
+        """Rulebook context for the question itself, empty when retrieval fails."""
+        try:
+            return (await self.retrieve_context(question)).strip()
+        except Exception as e:
+            print(f"Prefetched retrieval failed: {e}", flush=True)
+            return ""
+
+    async def search_web(self, question: str) -> List[SearchResult]:
+        """Scraped web pages for eager answering, empty when the search fails."""
+        try:
+            response = await self.web_tool.search_and_scrape(query=question)
+        except Exception as e:
+            print(f"Eager web search failed: {e}", flush=True)
+            return []
+        # Pages that could not be scraped only hold the reason, not context
+        return [result for result in response.results if result.scraped]
+
+    @staticmethod
+    def build_eager_prompt(
+        question: str, web_results: List[SearchResult], rulebook_context: str
+    ) -> str:
+        web_context = "\n\n".join(
+            f"Source: {result.url}\nTitle: {result.title}\n{result.scraped_content}"
+            for result in web_results
+        )
+        return system_prompts.EAGER_USER_PROMPT_TEMPLATE.format(
+            question=question,
+            web_context=web_context or "No web results found.",
+            rulebook_context=rulebook_context or "No rulebook excerpts found.",
+        )
+
+    @staticmethod
+    def build_tools_prompt(question: str, rulebook_context: str) -> str:
+        if not rulebook_context:
+            return question
+        return system_prompts.TOOLS_USER_PROMPT_TEMPLATE.format(
+            question=question, rulebook_context=rulebook_context
+        )
+
     def _register_tools(self) -> None:
         @self.main_agent.tool
         async def retrieve(context: RunContext[Deps], search_query: str) -> str:
@@ -93,30 +323,41 @@ class DndKnowledgeBase:
             Queries the local vector database (Qdrant) using the provided search query.
             Returns a concatenated string of relevant documents from the D&D 5e knowledge base.
             """
-            results = self.qdrant_service.query_documents(COLLECTION_NAME, search_query)
-            return "\n".join(results)
+            return await self.retrieve_context(search_query)
 
         @self.main_agent.tool
         async def web_search(
             context: RunContext[Deps], search_query: str
-        ) -> SearchResult:
+        ) -> List[SearchResult]:
             """
             Tool: web_search
 
             Description:
-            Performs a live Google search for the given query and scrapes the content
-            of the top result. Returns both the URL and the extracted page content.
+            Performs a live web search for the given query and scrapes the content
+            of the top results concurrently. Returns the URL and the extracted page
+            content of every result that could be scraped.
             """
             response = await self.web_tool.search_and_scrape(query=search_query)
             if not response.results:
-                return SearchResult(
-                    url="",
-                    title="No result",
-                    snippet="",
-                    scraped_content=f"No valid search results found for query: {search_query}",
-                )
-            print(response.results[0], flush=True)
-            return response.results[0]
+                return [
+                    SearchResult(
+                        url="",
+                        title="No result",
+                        snippet="",
+                        scraped_content=f"No valid search results found for query: {search_query}",
+                    )
+                ]
+            for result in response.results:
+                print(result, flush=True)
+            return response.results
+
+    async def startup(self) -> None:
+        await self.crawler_pool.start()
+
+    async def shutdown(self) -> None:
+        await self.crawler_pool.close()
+        await self.qdrant_service.close()
+        self.web_tool.cache.close()
 
     def get_main_agent(self) -> Agent:
         return self.main_agent
@@ -124,5 +365,14 @@ class DndKnowledgeBase:
     def get_intents_agent(self) -> Agent:
         return self.intents_agent
 
+    def get_answer_agent(self) -> Agent:
+        return self.answer_agent
+
+    def get_summary_agent(self) -> Agent:
+        return self.summary_agent
+
+    def get_intent_classifier(self) -> EmbeddingIntentClassifier:
+        return self.intent_classifier
+
     def get_deps(self) -> Deps:
         return Deps(client=self.qdrant_service.client)
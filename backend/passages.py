@@ -0,0 +1,108 @@
+"""
+Passage Selection Module
+
+This module cuts scraped pages down to the passages relevant to the query before
+they reach the model. Pages are split into passages, scored against the query
+with the dense and BM25 models, and the best passages are kept within a token
+budget in their original reading order.
+"""
+
+import os
+import re
+from typing import List
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from context_builder import estimate_tokens
+from embeddings import EmbeddingService
+
+# Configuration
+PASSAGE_TOKEN_BUDGET = int(os.getenv("PASSAGE_TOKEN_BUDGET", "600"))
+PASSAGE_MAX_CHARS = int(os.getenv("PASSAGE_MAX_CHARS", "800"))
+
+# Constant of reciprocal rank fusion, as used by Qdrant
+RRF_K = 60
+PASSAGE_SEPARATOR = "\n\n[...]\n\n"
+
+BLOCK_SEPARATOR = re.compile(r"\n\s*\n")
+
+
+class Passage(BaseModel):
+    start: int = Field(..., description="Offset of the passage in the page")
+    end: int = Field(..., description="End offset of the passage in the page")
+    score: float = Field(0.0, description="Relevance score of the passage")
+
+
+def split_passages(markdown: str, max_chars: int = PASSAGE_MAX_CHARS) -> List[Passage]:
+    """Split markdown into passages of whole paragraphs of up to `max_chars`."""
+    blocks = []
+    position = 0
+    for separator in BLOCK_SEPARATOR.finditer(markdown):
+        blocks.append((position, separator.start()))
+        position = separator.end()
+    blocks.append((position, len(markdown)))
+
+    # Paragraphs longer than a passage are cut at whitespace
+    pieces = []
+    for start, end in blocks:
+        while end - start > max_chars:
+            cut = markdown.rfind(" ", start, start + max_chars)
+            cut = cut if cut > start else start + max_chars
+            pieces.append((start, cut))
+            start = cut
+        if markdown[start:end].strip():
+            pieces.append((start, end))
+
+    passages: List[Passage] = []
+    for start, end in pieces:
+        if passages and end - passages[-1].start <= max_chars:
+            passages[-1].end = end
+        else:
+            passages.append(Passage(start=start, end=end))
+    return passages
+
+
+class PassageSelector:
+    """Keeps the passages of a page that are most relevant to a query."""
+
+    def __init__(
+        self,
+        embedder: EmbeddingService,
+        token_budget: int = PASSAGE_TOKEN_BUDGET,
+        max_chars: int = PASSAGE_MAX_CHARS,
+    ):
+        self.embedder = embedder
+        self.token_budget = token_budget
+        self.max_chars = max_chars
+
+    async def select(self, query: str, markdown: str) -> List[Passage]:
+        """Best passages within the token budget, in reading order."""
+        passages = split_passages(markdown, self.max_chars)
+        texts = [markdown[p.start : p.end] for p in passages]
+        if sum(estimate_tokens(text) for text in texts) <= self.token_budget:
+            return passages
+
+        dense_scores, sparse_scores = await self.embedder.score_passages(query, texts)
+
+        # Fuse the two rankings with RRF, the raw scores are not comparable
+        fused = np.zeros(len(passages), dtype=np.float32)
+        for scores in (dense_scores, sparse_scores):
+            for rank, index in enumerate(np.argsort(-scores)):
+                fused[index] += 1.0 / (RRF_K + rank + 1)
+
+        selected, used_tokens = [], 0
+        for index in np.argsort(-fused):
+            tokens = estimate_tokens(texts[index])
+            if used_tokens + tokens > self.token_budget:
+                continue
+            passages[index].score = float(fused[index])
+            selected.append(passages[index])
+            used_tokens += tokens
+
+        return sorted(selected, key=lambda p: p.start)
+
+    @staticmethod
+    def join(markdown: str, passages: List[Passage]) -> str:
+        """Concatenate the selected passages, marking the gaps between them."""
+        return PASSAGE_SEPARATOR.join(markdown[p.start : p.end] for p in passages)
@@ -0,0 +1,129 @@
+"""
+Readiness Module
+
+This module warms up the server's dependencies when it starts: it loads models,
+opens connections and runs a first request against each of them, so the first
+users after a deploy don't pay for it. Warmups run concurrently, each with a
+timeout. A required component that fails is retried until it succeeds, and the
+server is ready once every required component is.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Configuration
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "120"))
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "10"))
+
+
+@dataclass
+class Component:
+    """A dependency of the server and how far its warmup got."""
+
+    name: str
+    warmup: Optional[Callable[[], Awaitable]] = field(default=None, repr=False)
+    required: bool = True
+    timeout: float = WARMUP_TIMEOUT
+    # pending, warming, ready, failed or timeout
+    status: str = "pending"
+    attempts: int = 0
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+
+    def report(self) -> dict:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "attempts": self.attempts,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+        }
+
+
+class Readiness:
+    """Runs component warmups concurrently and reports whether the server is ready."""
+
+    def __init__(self, retry_interval: float = WARMUP_RETRY_INTERVAL):
+        self.retry_interval = retry_interval
+        self.components: Dict[str, Component] = {}
+        self.started_at = time.monotonic()
+        self.ready_after_ms: Optional[float] = None
+
+    def add(
+        self,
+        name: str,
+        warmup: Callable[[], Awaitable],
+        required: bool = True,
+        timeout: float = WARMUP_TIMEOUT,
+    ) -> None:
+        self.components[name] = Component(
+            name=name, warmup=warmup, required=required, timeout=timeout
+        )
+
+    def record(self, name: str, duration_ms: float) -> None:
+        """Record a component that was set up outside of the warmups."""
+        self.components[name] = Component(
+            name=name, status="ready", attempts=1, duration_ms=duration_ms
+        )
+        self._check_ready()
+
+    @property
+    def ready(self) -> bool:
+        return all(
+            component.status == "ready"
+            for component in self.components.values()
+            if component.required
+        )
+
+    def _check_ready(self) -> None:
+        if self.ready_after_ms is None and self.ready:
+            self.ready_after_ms = (time.monotonic() - self.started_at) * 1000
+            print(f"Ready after {self.ready_after_ms:.0f} ms", flush=True)
+
+    async def _warm(self, component: Component) -> None:
+        while True:
+            component.status = "warming"
+            component.attempts += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(component.warmup(), component.timeout)
+                component.status, component.error = "ready", None
+            except asyncio.TimeoutError:
+                component.status = "timeout"
+                component.error = f"Not ready after {component.timeout:.0f}s"
+            except Exception as e:
+                component.status, component.error = "failed", str(e) or repr(e)
+            component.duration_ms = (time.perf_counter() - started) * 1000
+
+            if component.status == "ready":
+                print(
+                    f"Warmed up {component.name} in {component.duration_ms:.0f} ms",
+                    flush=True,
+                )
+                self._check_ready()
+                return
+            print(f"Warming up {component.name} failed: {component.error}", flush=True)
+            if not component.required:
+                return
+            await asyncio.sleep(self.retry_interval)
+
+    async def run(self) -> None:
+        """Warm up every component that has not been warmed up yet."""
+        pending: List[Component] = [
+            component
+            for component in self.components.values()
+            if component.warmup is not None and component.status == "pending"
+        ]
+        await asyncio.gather(*(self._warm(component) for component in pending))
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "ready_after_ms": self.ready_after_ms,
+            "components": {
+                name: component.report() for name, component in self.components.items()
+            },
+        }
@@ -0,0 +1,178 @@
+"""
+Token verification against a stub key set: known and unknown key ids, the
+refresh rate limit, stale keys while Keycloak is down and the verified token
+cache. Keys are generated for the test, so it runs offline.
+"""
+
+import asyncio
+import time
+import uuid
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jwt.algorithms import RSAAlgorithm
+
+import auth
+from auth import JWKSFetcher, KeycloakAuth, VerifiedTokenCache
+
+ISSUER = f"{auth.KEYCLOAK_URL}/realms/{auth.KEYCLOAK_REALM}"
+REFRESH_INTERVAL = 30.0
+MAX_AGE = 3600.0
+
+
+class SigningKey:
+    def __init__(self):
+        self.kid = uuid.uuid4().hex
+        self._private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        )
+
+    def jwk(self) -> dict:
+        jwk = RSAAlgorithm.to_jwk(self._private_key.public_key(), as_dict=True)
+        return {**jwk, "kid": self.kid, "use": "sig", "alg": "RS256"}
+
+    def sign(self, lifetime: int = 3600) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": ISSUER,
+            "sub": "user-1",
+            "jti": uuid.uuid4().hex,
+            "iat": now,
+            "exp": now + lifetime,
+        }
+        return jwt.encode(
+            claims, self._private_key, algorithm="RS256", headers={"kid": self.kid}
+        )
+
+
+class StubJWKS:
+    """Serves a key set through httpx, or fails while Keycloak is 'down'."""
+
+    def __init__(self, *keys: SigningKey):
+        self.keys = list(keys)
+        self.available = True
+        self.requests = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if not self.available:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"keys": [key.jwk() for key in self.keys]})
+
+
+@pytest.fixture
+def key() -> SigningKey:
+    return SigningKey()
+
+
+@pytest.fixture
+def stub_jwks(monkeypatch, key) -> StubJWKS:
+    stub = StubJWKS(key)
+    async_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        httpx,
+        "AsyncClient",
+        lambda **kwargs: async_client(
+            transport=httpx.MockTransport(stub.handle), **kwargs
+        ),
+    )
+    return stub
+
+
+@pytest.fixture
+def keycloak() -> KeycloakAuth:
+    return KeycloakAuth(
+        jwks=JWKSFetcher(
+            url="http://keycloak.test/certs",
+            refresh_interval=REFRESH_INTERVAL,
+            max_age=MAX_AGE,
+        ),
+        token_cache=VerifiedTokenCache(),
+    )
+
+
+def verify(keycloak: KeycloakAuth, token: str) -> dict:
+    return asyncio.run(keycloak.verify_token(token))
+
+
+def rejected_status(keycloak: KeycloakAuth, token: str) -> int:
+    with pytest.raises(HTTPException) as error:
+        verify(keycloak, token)
+    return error.value.status_code
+
+
+def let_time_pass(fetcher: JWKSFetcher, seconds: float) -> None:
+    """Age the key set and the last fetch attempt instead of sleeping."""
+    if fetcher.fetched_at is not None:
+        fetcher.fetched_at -= seconds
+    if fetcher.last_attempt is not None:
+        fetcher.last_attempt -= seconds
+
+
+def test_known_kid_is_fetched_once_then_served_from_caches(stub_jwks, keycloak, key):
+    token = key.sign()
+
+    assert verify(keycloak, token)["sub"] == "user-1"
+    assert verify(keycloak, token)["sub"] == "user-1"
+    assert verify(keycloak, key.sign())["sub"] == "user-1"
+
+    assert stub_jwks.requests == 1
+    assert keycloak.token_cache.hits == 1
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval(stub_jwks, keycloak, key):
+    verify(keycloak, key.sign())
+    rotated = SigningKey()
+
+    assert rejected_status(keycloak, rotated.sign()) == 401
+    assert rejected_status(keycloak, rotated.sign()) == 401
+    # Both unknown kids fell within the refresh interval of the first fetch
+    assert stub_jwks.requests == 1
+
+    stub_jwks.keys.append(rotated)
+    let_time_pass(keycloak.jwks, REFRESH_INTERVAL)
+    assert rejected_status(keycloak, SigningKey().sign()) == 401
+    assert stub_jwks.requests == 2
+    # The refresh caused by the forged kid also picked up the rotated key
+    assert verify(keycloak, rotated.sign())["sub"] == "user-1"
+    assert stub_jwks.requests == 2
+
+
+def test_stale_key_is_kept_while_keycloak_is_down(stub_jwks, keycloak, key):
+    verify(keycloak, key.sign())
+    stub_jwks.available = False
+    let_time_pass(keycloak.jwks, MAX_AGE + 1)
+
+    assert verify(keycloak, key.sign())["sub"] == "user-1"
+    assert stub_jwks.requests == 2
+    # The failed attempt is rate limited like a successful one
+    for _ in range(5):
+        assert verify(keycloak, key.sign())["sub"] == "user-1"
+    assert stub_jwks.requests == 2
+
+    let_time_pass(keycloak.jwks, REFRESH_INTERVAL)
+    assert verify(keycloak, key.sign())["sub"] == "user-1"
+    assert stub_jwks.requests == 3
+
+
+def test_no_keys_while_keycloak_is_down_is_unavailable(stub_jwks, keycloak, key):
+    stub_jwks.available = False
+
+    assert rejected_status(keycloak, key.sign()) == 503
+    assert rejected_status(keycloak, key.sign()) == 503
+    assert stub_jwks.requests == 1
+
+
+def test_verified_token_expires_from_the_cache_at_exp(stub_jwks, keycloak, key):
+    token = key.sign(lifetime=2)
+    claims = verify(keycloak, token)
+    assert keycloak.token_cache.get(token) == claims
+
+    time.sleep(claims["exp"] - time.time() + 0.1)
+
+    assert keycloak.token_cache.get(token) is None
+    assert keycloak.token_cache.stats()["entries"] == 0
+    assert rejected_status(keycloak, token) == 401
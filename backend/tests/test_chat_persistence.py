@@ -0,0 +1,84 @@
+"""
+Write-behind retries against a stub chat history whose writes can succeed
+while their reply is lost.
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from chat_persistence import ChatWriteBehind
+
+
+class LostReplyHistory:
+    """Stores every append, but fails the first `lost_replies` after storing."""
+
+    def __init__(self, lost_replies: int = 1):
+        self.lost_replies = lost_replies
+        self.messages: List[Dict] = []
+
+    async def append_message(
+        self,
+        session_id: str,
+        user_id: str,
+        content: str,
+        is_user: bool,
+        key: Optional[str] = None,
+    ) -> Optional[int]:
+        seq = len(self.messages)
+        self.messages.append({"seq": seq, "key": key, "content": content})
+        if self.lost_replies:
+            self.lost_replies -= 1
+            raise ConnectionError("connection reset after the write")
+        return seq
+
+    async def find_message_seq(
+        self, session_id: str, user_id: str, key: str
+    ) -> Optional[int]:
+        return next((m["seq"] for m in self.messages if m["key"] == key), None)
+
+    async def set_message_content(
+        self,
+        session_id: str,
+        user_id: str,
+        seq: int,
+        content: str,
+        touch_session: bool = False,
+    ) -> bool:
+        self.messages[seq]["content"] = content
+        return True
+
+
+def test_retried_append_does_not_duplicate_the_message():
+    history = LostReplyHistory()
+
+    async def run():
+        writer = ChatWriteBehind(history)
+        await writer.append("session", "user", "What is a cantrip?", is_user=True)
+        await writer.flush()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert [m["content"] for m in history.messages] == ["What is a cantrip?"]
+    assert stats["written"] == 1
+    assert stats["failed"] == 0
+
+
+def test_streamed_message_keeps_its_slot_after_a_lost_reply():
+    history = LostReplyHistory()
+
+    async def run():
+        writer = ChatWriteBehind(history)
+        message = await writer.open_message("session", "user", is_user=False)
+        message.checkpoint_tokens = 1
+        message.update("A cantrip")
+        await writer.flush()
+        message.update("A cantrip is a spell")
+        message.finish("A cantrip is a spell you can cast at will.")
+        await writer.flush()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert [m["content"] for m in history.messages] == [
+        "A cantrip is a spell you can cast at will."
+    ]
+    assert stats["open_messages"] == 0
@@ -0,0 +1,45 @@
+"""
+Fitting retrieved chunks into the token budget of the context.
+"""
+
+from context_builder import ContextAssembler, estimate_tokens
+from main import RetrievedChunk
+
+TOKEN_BUDGET = 50
+
+
+def assembler() -> ContextAssembler:
+    return ContextAssembler(context_window=TOKEN_BUDGET, budget_ratio=1.0)
+
+
+def words(count: int, word: str = "fireball") -> str:
+    return " ".join([word] * count)
+
+
+def test_chunks_past_the_budget_are_skipped():
+    chunks = [
+        RetrievedChunk(text=words(10, "fireball"), score=0.9),
+        RetrievedChunk(text=words(40, "cantrip"), score=0.8),
+        RetrievedChunk(text=words(5, "wizard"), score=0.7),
+    ]
+
+    selected = assembler().select(chunks, max_chunks=3)
+
+    assert [chunk.text for chunk in selected] == [chunks[0].text, chunks[2].text]
+
+
+def test_oversized_top_chunk_is_kept_truncated_to_the_budget():
+    chunks = [
+        RetrievedChunk(text=words(100, "fireball"), score=0.9),
+        RetrievedChunk(text=words(100, "cantrip"), score=0.8),
+    ]
+
+    selected = assembler().select(chunks, max_chunks=3)
+
+    assert len(selected) == 1
+    assert estimate_tokens(selected[0].text) <= TOKEN_BUDGET
+    assert chunks[0].text.startswith(selected[0].text)
+    assert selected[0].text.endswith("fireball")
+    assert selected[0].score == chunks[0].score
+    # The retrieved chunk itself is left untouched
+    assert chunks[0].text == words(100, "fireball")
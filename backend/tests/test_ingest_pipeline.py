@@ -0,0 +1,74 @@
+"""
+The indexing pipeline end to end over several batches, against an in-memory
+Qdrant. The embedding workers load stub models instead of fastembed, so this
+runs offline.
+"""
+
+import zlib
+
+from qdrant_client import QdrantClient
+
+import ingest_pipeline
+from ingest_pipeline import ChunkRecord, IndexingPipeline
+
+VECTOR_SIZE = 4
+BATCH_SIZE = 64
+CHUNKS = 30 * BATCH_SIZE + 5
+COLLECTION_NAME = "pipeline_test"
+
+
+# Run in the spawned embedding workers, which import them from this module
+def init_stub_worker(embedding_model: str, sparse_model: str) -> None:
+    pass
+
+
+def embed_stub_batch(texts):
+    dense = []
+    sparse = []
+    for text in texts:
+        checksum = zlib.crc32(text.encode())
+        dense.append([float(checksum % 97 + 1), 1.0, 2.0, 3.0])
+        sparse.append(([checksum % 1000], [1.0]))
+    return dense, sparse
+
+
+def chunks(count: int):
+    for index in range(count):
+        yield ChunkRecord(
+            id=index, text=f"Chunk {index}", metadata={"source": "test.md"}
+        )
+
+
+def test_pipeline_upserts_every_chunk_over_many_batches(monkeypatch):
+    monkeypatch.setattr(ingest_pipeline, "_init_embedding_worker", init_stub_worker)
+    monkeypatch.setattr(ingest_pipeline, "_embed_batch", embed_stub_batch)
+    monkeypatch.setattr(IndexingPipeline, "vector_size", lambda self: VECTOR_SIZE)
+
+    client = QdrantClient(":memory:")
+    pipeline = IndexingPipeline(
+        client,
+        COLLECTION_NAME,
+        batch_size=BATCH_SIZE,
+        embedding_workers=2,
+        upsert_parallelism=4,
+        queue_size=4,
+    )
+    progress = []
+    upserted = pipeline.run(
+        chunks(CHUNKS), on_progress=lambda *counts: progress.append(counts)
+    )
+
+    # Local Qdrant is not thread-safe, so its upserts are not run concurrently
+    assert pipeline.upsert_parallelism == 1
+    assert upserted == CHUNKS
+    assert client.count(COLLECTION_NAME).count == CHUNKS
+    assert progress[-1] == (CHUNKS, CHUNKS)
+
+    points, _ = client.scroll(COLLECTION_NAME, limit=CHUNKS, with_vectors=True)
+    assert sorted(point.id for point in points) == list(range(CHUNKS))
+    for point in points:
+        assert point.payload == {"document": f"Chunk {point.id}", "source": "test.md"}
+        assert set(point.vector) == {
+            pipeline.dense_vector_name,
+            pipeline.sparse_vector_name,
+        }
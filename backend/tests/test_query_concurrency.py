@@ -0,0 +1,117 @@
+"""
+Concurrent retrievals must not stall the event loop: query embedding and the
+rerank run on the embedding executor, and Qdrant is queried asynchronously.
+The models and the Qdrant client are stubs, so this runs offline.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+from embeddings import EmbeddingService
+from main import QdrantService
+
+BLOCK_SECONDS = 0.2
+RETRIEVALS = 6
+WORKERS = 2
+TICK_SECONDS = 0.01
+MAX_LAG_SECONDS = 0.1
+
+
+class BlockingDenseModel:
+    def query_embed(self, text):
+        time.sleep(BLOCK_SECONDS)
+        yield np.ones(4, dtype=np.float32)
+
+
+class BlockingSparseModel:
+    def query_embed(self, text):
+        yield SimpleNamespace(indices=np.array([1]), values=np.array([1.0]))
+
+
+class BlockingReranker:
+    def rerank(self, query, documents):
+        time.sleep(BLOCK_SECONDS)
+        return [float(index) for index, _ in enumerate(documents)]
+
+
+def blocking_embedder() -> EmbeddingService:
+    """The real service with its models replaced by blocking stubs."""
+    embedder = EmbeddingService.__new__(EmbeddingService)
+    embedder.embedding_model_name = "stub/dense"
+    embedder.sparse_model_name = "stub/sparse"
+    embedder.rerank_model_name = "stub/rerank"
+    embedder.dense_vector_name = "fast-dense"
+    embedder.sparse_vector_name = "fast-sparse-sparse"
+    embedder.dense_model = BlockingDenseModel()
+    embedder.sparse_model = BlockingSparseModel()
+    embedder.reranker = BlockingReranker()
+    embedder.executor = ThreadPoolExecutor(max_workers=WORKERS)
+    return embedder
+
+
+class StubQdrantClient:
+    def __init__(self):
+        self.queries = 0
+
+    async def query_points(self, collection_name, **kwargs):
+        self.queries += 1
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(
+            points=[
+                SimpleNamespace(
+                    payload={"document": f"Chunk {index}"},
+                    score=1.0 / (index + 1),
+                    vector={"fast-dense": [1.0, 0.0, 0.0, 0.0]},
+                )
+                for index in range(3)
+            ]
+        )
+
+    async def close(self):
+        pass
+
+
+async def run_with_ticker(service: QdrantService):
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            service.query_documents("handbook", f"question {index}")
+            for index in range(RETRIEVALS)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker_task
+    return results, lags, elapsed
+
+
+def test_event_loop_keeps_ticking_during_retrievals():
+    client = StubQdrantClient()
+    service = QdrantService(embedder=blocking_embedder(), client=client)
+    try:
+        results, lags, elapsed = asyncio.run(run_with_ticker(service))
+    finally:
+        service.embedder.close()
+
+    assert len(results) == RETRIEVALS
+    assert all(len(documents) == 3 for documents in results)
+    assert client.queries == RETRIEVALS
+    # Every retrieval blocked twice on the executor, WORKERS at a time
+    assert elapsed >= 2 * BLOCK_SECONDS * RETRIEVALS / WORKERS * 0.9
+    # ...yet the loop kept running the ticker the whole time
+    assert len(lags) >= elapsed / (TICK_SECONDS + MAX_LAG_SECONDS)
+    assert max(lags) < MAX_LAG_SECONDS
@@ -0,0 +1,194 @@
+"""
+Web cache behaviour with a stub searcher and a stub browser pool: TTL expiry,
+size-bound LRU eviction, short-lived empty searches, unchanged pages and
+coalescing of concurrent fetches into one.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+import web_cache
+from web_cache import SingleFlight, WebCache
+from web_search import WebSearchTool
+
+CONCURRENT_FETCHES = 10
+FETCH_SECONDS = 0.2
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class StubSearcher:
+    def __init__(self):
+        self.items = [{"href": "https://example.com/fireball", "title": "Fireball"}]
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str, max_results: int):
+        with self._lock:
+            self.calls += 1
+        # Blocks like DDGS does, in the thread the tool runs it in
+        time.sleep(FETCH_SECONDS)
+        return self.items[:max_results]
+
+
+class StubCrawler:
+    def __init__(self):
+        self.calls = 0
+
+    async def arun(self, url, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(FETCH_SECONDS)
+        return SimpleNamespace(
+            success=True,
+            error_message=None,
+            markdown=SimpleNamespace(fit_markdown=f"# Page at {url}"),
+        )
+
+
+class StubPool:
+    def __init__(self):
+        self.crawler = StubCrawler()
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.crawler
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(web_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = WebCache(
+        path=str(tmp_path / "web_cache.sqlite3"),
+        search_ttl=100,
+        page_ttl=1000,
+        max_bytes=1000,
+        empty_search_ttl=10,
+    )
+    yield cache
+    cache.close()
+
+
+def test_entries_expire_after_their_ttl(cache, clock):
+    asyncio.run(cache.put_search("3:fireball", [{"href": "https://a"}]))
+    asyncio.run(cache.put_page("https://a", "page"))
+
+    clock.advance(99)
+    assert asyncio.run(cache.get_search("3:fireball")) == [{"href": "https://a"}]
+    clock.advance(2)
+    assert asyncio.run(cache.get_search("3:fireball")) is None
+    assert asyncio.run(cache.get_page("https://a")) == "page"
+    clock.advance(1000)
+    assert asyncio.run(cache.get_page("https://a")) is None
+
+
+def test_empty_search_results_are_kept_briefly(cache, clock):
+    asyncio.run(cache.put_search("3:nothing", []))
+
+    assert asyncio.run(cache.get_search("3:nothing")) == []
+    clock.advance(11)
+    assert asyncio.run(cache.get_search("3:nothing")) is None
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size_limit(cache, clock):
+    for name in ("a", "b", "c"):
+        asyncio.run(cache.put_page(f"https://{name}", name * 400))
+        clock.advance(1)
+    # Only two 400 byte pages fit; "a" went first
+    assert asyncio.run(cache.get_page("https://a")) is None
+
+    # Reading "b" makes "c" the least recently used one
+    clock.advance(1)
+    assert asyncio.run(cache.get_page("https://b")) == "b" * 400
+    clock.advance(1)
+    asyncio.run(cache.put_page("https://d", "d" * 400))
+
+    assert asyncio.run(cache.get_page("https://c")) is None
+    assert asyncio.run(cache.get_page("https://b")) == "b" * 400
+    assert asyncio.run(cache.get_page("https://d")) == "d" * 400
+    assert cache.stats()["page_bytes"] <= 1000
+
+
+def test_unchanged_page_only_gets_a_new_expiry(cache, clock):
+    asyncio.run(cache.put_page("https://a", "page"))
+    clock.advance(900)
+    asyncio.run(cache.put_page("https://a", "page"))
+    clock.advance(900)
+
+    assert asyncio.run(cache.get_page("https://a")) == "page"
+    assert cache.stats()["unchanged_pages"] == 1
+
+    asyncio.run(cache.put_page("https://a", "changed"))
+    assert asyncio.run(cache.get_page("https://a")) == "changed"
+    assert cache.stats()["unchanged_pages"] == 1
+
+
+def test_single_flight_shares_one_fetch_between_callers():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(FETCH_SECONDS)
+        return "result"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *(flight.do("key", fetch) for _ in range(CONCURRENT_FETCHES))
+        )
+        return results, len(flight)
+
+    results, in_flight = asyncio.run(run())
+    assert results == ["result"] * CONCURRENT_FETCHES
+    assert calls == 1
+    assert in_flight == 0
+
+
+def test_concurrent_searches_and_scrapes_fetch_once(cache):
+    searcher = StubSearcher()
+    pool = StubPool()
+
+    async def run():
+        tool = WebSearchTool(crawler_pool=pool, cache=cache, searcher=searcher)
+        searches = await asyncio.gather(
+            *(
+                tool._search("What does Fireball do?", 3)
+                for _ in range(CONCURRENT_FETCHES)
+            )
+        )
+        pages = await asyncio.gather(
+            *(
+                tool._scrape("https://example.com/fireball")
+                for _ in range(CONCURRENT_FETCHES)
+            )
+        )
+        # Served from the cache once fetched
+        await tool._search("what does  fireball do?", 3)
+        await tool._scrape("https://example.com/fireball")
+        return searches, pages
+
+    searches, pages = asyncio.run(run())
+    assert searches == [searcher.items] * CONCURRENT_FETCHES
+    assert pages == ["# Page at https://example.com/fireball"] * CONCURRENT_FETCHES
+    assert searcher.calls == 1
+    assert pool.crawler.calls == 1
@@ -0,0 +1,229 @@
+"""
+Web Cache Module
+
+This module persists web search results and scraped pages in a local SQLite
+database so popular pages are not searched and crawled again for every question.
+Entries expire after a per-kind TTL, the database is kept under a size limit by
+evicting the least recently used entries, and concurrent requests for the same
+key are coalesced into a single fetch. Searches without results are kept only
+briefly, and a page crawled again with unchanged content only gets a new expiry.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+# Configuration
+WEB_CACHE_PATH = os.getenv("WEB_CACHE_PATH", "web_cache.sqlite3")
+WEB_SEARCH_CACHE_TTL = int(os.getenv("WEB_SEARCH_CACHE_TTL", "21600"))
+# Empty results are often transient, so they are only cached to absorb bursts
+WEB_EMPTY_SEARCH_CACHE_TTL = int(os.getenv("WEB_EMPTY_SEARCH_CACHE_TTL", "60"))
+WEB_PAGE_CACHE_TTL = int(os.getenv("WEB_PAGE_CACHE_TTL", "604800"))
+WEB_CACHE_MAX_BYTES = int(os.getenv("WEB_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_results (
+    query_key TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    markdown TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+"""
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one running task."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            # A cancelled caller must not cancel the fetch others are waiting on
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # ...unless nobody else is waiting for it
+            if flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+
+class WebCache:
+    """SQLite-backed cache of search results and scraped page markdown."""
+
+    def __init__(
+        self,
+        path: str = WEB_CACHE_PATH,
+        search_ttl: int = WEB_SEARCH_CACHE_TTL,
+        page_ttl: int = WEB_PAGE_CACHE_TTL,
+        max_bytes: int = WEB_CACHE_MAX_BYTES,
+        empty_search_ttl: int = WEB_EMPTY_SEARCH_CACHE_TTL,
+    ):
+        self.search_ttl = search_ttl
+        self.page_ttl = page_ttl
+        self.max_bytes = max_bytes
+        self.empty_search_ttl = empty_search_ttl
+        self.hits = 0
+        self.misses = 0
+        self.unchanged_pages = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def _get(self, table: str, key_column: str, value_column: str, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {value_column}, expires_at FROM {table} WHERE {key_column} = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[1] < now:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                f"UPDATE {table} SET last_access = ? WHERE {key_column} = ?",
+                (now, key),
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the least recently used ones over the size limit."""
+        now = time.time()
+        self._conn.execute("DELETE FROM search_results WHERE expires_at < ?", (now,))
+        self._conn.execute("DELETE FROM pages WHERE expires_at < ?", (now,))
+
+        total = self._conn.execute(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM search_results)"
+            " + (SELECT COALESCE(SUM(size), 0) FROM pages)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT 'search_results', query_key, size, last_access FROM search_results"
+            " UNION ALL SELECT 'pages', url, size, last_access FROM pages"
+            " ORDER BY last_access"
+        ).fetchall()
+        for table, key, size, _ in rows:
+            if total <= self.max_bytes:
+                break
+            key_column = "query_key" if table == "search_results" else "url"
+            self._conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+            total -= size
+
+    def _get_search(self, query_key: str) -> Optional[List[dict]]:
+        results = self._get("search_results", "query_key", "results", query_key)
+        return None if results is None else json.loads(results)
+
+    def _put_search(self, query_key: str, results: List[dict]) -> None:
+        payload = json.dumps(results)
+        ttl = self.search_ttl if results else self.empty_search_ttl
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?, ?)",
+                (query_key, payload, len(payload), now + ttl, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _get_page(self, url: str) -> Optional[str]:
+        return self._get("pages", "url", "markdown", url)
+
+    def _put_page(self, url: str, markdown: str) -> None:
+        content_hash = hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            # An unchanged page only gets a new expiry, its markdown stays as is
+            unchanged = self._conn.execute(
+                "UPDATE pages SET expires_at = ?, last_access = ?"
+                " WHERE url = ? AND content_hash = ?",
+                (now + self.page_ttl, now, url, content_hash),
+            ).rowcount
+            if unchanged:
+                self.unchanged_pages += 1
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        url,
+                        content_hash,
+                        markdown,
+                        len(markdown.encode("utf-8")),
+                        now + self.page_ttl,
+                        now,
+                    ),
+                )
+                self._evict()
+            self._conn.commit()
+
+    async def get_search(self, query_key: str) -> Optional[List[dict]]:
+        return await asyncio.to_thread(self._get_search, query_key)
+
+    async def put_search(self, query_key: str, results: List[dict]) -> None:
+        await asyncio.to_thread(self._put_search, query_key, results)
+
+    async def get_page(self, url: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get_page, url)
+
+    async def put_page(self, url: str, markdown: str) -> None:
+        await asyncio.to_thread(self._put_page, url, markdown)
+
+    def stats(self) -> dict:
+        with self._lock:
+            searches = self._conn.execute(
+                "SELECT COUNT(*) FROM search_results"
+            ).fetchone()[0]
+            pages, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        return {
+            "searches": searches,
+            "pages": pages,
+            "page_bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "unchanged_pages": self.unchanged_pages,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
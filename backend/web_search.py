@@ -1,9 +1,23 @@
-from typing import List, Optional
+import asyncio
+import os
+from typing import Callable, List, Optional, Tuple
 from pydantic import BaseModel, Field
 from ddgs import DDGS
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
+from crawl4ai import CrawlerRunConfig, CacheMode
 from urllib.parse import urlparse
 
+from browser_pool import CrawlerPool, CrawlerPoolExhausted
+from embeddings import normalize_text
+from passages import Passage, PassageSelector
+from web_cache import SingleFlight, WebCache
+
+# Configuration
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "3"))
+# Return as soon as this many pages were scraped successfully
+WEB_SEARCH_MIN_RESULTS = int(os.getenv("WEB_SEARCH_MIN_RESULTS", "2"))
+WEB_SCRAPE_URL_TIMEOUT = float(os.getenv("WEB_SCRAPE_URL_TIMEOUT", "8"))
+WEB_SEARCH_DEADLINE = float(os.getenv("WEB_SEARCH_DEADLINE", "12"))
+
 
 class SearchResult(BaseModel):
     url: str = Field(..., description="URL of the search result")
@@ -12,6 +26,10 @@ class SearchResult(BaseModel):
     scraped_content: Optional[str] = Field(
         None, description="Scraped content in markdown"
     )
+    # Offsets of the selected passages in the scraped page, not sent to the model
+    passages: List[Passage] = Field(default_factory=list, exclude=True)
+    # False when scraped_content only says why the page could not be scraped
+    scraped: bool = Field(False, exclude=True)
 
 
 class SearchList(BaseModel):
@@ -20,72 +38,190 @@ class SearchList(BaseModel):
     )
 
 
+class CrawlError(Exception):
+    """Raised when a page could not be crawled."""
+
+
+def ddgs_search(query: str, max_results: int) -> List[dict]:
+    """Search DuckDuckGo and return the raw result items."""
+    return list(DDGS().text(query, max_results=max_results))
+
+
 class WebSearchTool:
+    def __init__(
+        self,
+        crawler_pool: Optional[CrawlerPool] = None,
+        cache: Optional[WebCache] = None,
+        searcher: Callable[[str, int], List[dict]] = ddgs_search,
+        passage_selector: Optional[PassageSelector] = None,
+        min_results: int = WEB_SEARCH_MIN_RESULTS,
+        url_timeout: float = WEB_SCRAPE_URL_TIMEOUT,
+        deadline: float = WEB_SEARCH_DEADLINE,
+    ):
+        self.crawler_pool = crawler_pool or CrawlerPool()
+        self.cache = cache or WebCache()
+        self.searcher = searcher
+        self.passage_selector = passage_selector
+        self.min_results = min_results
+        self.url_timeout = url_timeout
+        self.deadline = deadline
+        self._inflight = SingleFlight()
+
     def _validate_url(self, url: str) -> Optional[str]:
         parsed = urlparse(url)
         if parsed.scheme not in ("http", "https"):
             return None
         return url
 
-    async def search_and_scrape(self, query: str, max_results: int = 1) -> SearchList:
-        ddgs = DDGS()
-        results = []
+    async def _search(self, query: str, max_results: int) -> List[dict]:
+        """Search results for the query, served from the cache when fresh."""
+        query_key = f"{max_results}:{normalize_text(query)}"
+        cached = await self.cache.get_search(query_key)
+        if cached is not None:
+            return cached
+
+        async def fetch() -> List[dict]:
+            # DDGS is synchronous, keep it off the event loop
+            items = await asyncio.to_thread(self.searcher, query, max_results)
+            await self.cache.put_search(query_key, items)
+            return items
+
+        return await self._inflight.do(("search", query_key), fetch)
+
+    async def _crawl(self, url: str) -> str:
+        async with self.crawler_pool.acquire() as crawler:
+            crawl_result = await crawler.arun(
+                url=url,
+                config=CrawlerRunConfig(cache_mode=CacheMode.BYPASS),
+                check_robots_txt=False,
+                only_text=True,
+                remove_forms=True,
+                remove_overlay_elements=True,
+                exclude_external_links=True,
+                magic=True,
+                simulate_user=True,
+            )
+        if not crawl_result.success:
+            raise CrawlError(
+                f"Crawl failed: {crawl_result.error_message or 'unknown error'}"
+            )
+
+        # Only successful crawls are cached, failures are retried next time
+        scraped_md = crawl_result.markdown.fit_markdown
+        await self.cache.put_page(url, scraped_md)
+        return scraped_md
+
+    async def _scrape(self, url: str) -> str:
+        """Markdown of the page, served from the cache when fresh."""
+        cached = await self.cache.get_page(url)
+        if cached is not None:
+            return cached
+        return await self._inflight.do(("page", url), lambda: self._crawl(url))
+
+    async def _scrape_item(
+        self, item: dict, query: str
+    ) -> Tuple[SearchResult, bool]:
+        """Scrape one search result; the flag tells whether the content is usable."""
+        url = item.get("href")
+        title = item.get("title")
+        snippet = item.get("body")
+
+        validated_url = self._validate_url(url)
+        if not validated_url:
+            return (
+                SearchResult(
+                    url=url or "",
+                    title=title,
+                    snippet=snippet,
+                    scraped_content="Invalid URL",
+                ),
+                False,
+            )
+
+        usable = False
+        passages: List[Passage] = []
+        try:
+            scraped_md = await asyncio.wait_for(
+                self._scrape(validated_url), timeout=self.url_timeout
+            )
+            usable = bool(scraped_md and scraped_md.strip())
+            if usable and self.passage_selector is not None:
+                passages = await self.passage_selector.select(query, scraped_md)
+                scraped_md = self.passage_selector.join(scraped_md, passages)
+        except asyncio.TimeoutError:
+            scraped_md = "Crawl timed out"
+        except CrawlerPoolExhausted as e:
+            # Fall back to the search snippet when every browser is busy
+            scraped_md = f"Crawl skipped: {e}"
+        except CrawlError as e:
+            scraped_md = str(e)
+        except Exception as e:
+            scraped_md = f"Crawl exception: {e}"
+
+        return (
+            SearchResult(
+                url=validated_url,
+                title=title,
+                snippet=snippet,
+                scraped_content=scraped_md,
+                passages=passages,
+                scraped=usable,
+            ),
+            usable,
+        )
+
+    async def search_and_scrape(
+        self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS
+    ) -> SearchList:
+        """
+        Search the web and scrape the results concurrently. Returns once
+        `min_results` pages were scraped successfully or the overall deadline,
+        which covers the search too, passed, cancelling the scrapes that are
+        still running.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
 
         # Get search results
         try:
-            search_items = list(ddgs.text(query, max_results=max_results))
+            search_items = await asyncio.wait_for(
+                self._search(query, max_results), timeout=self.deadline
+            )
+        except asyncio.TimeoutError:
+            print(f"Search timed out after {self.deadline:.0f}s", flush=True)
+            return SearchList(results=[])
         except Exception as e:
             print(f"Search failed: {e}")
             return SearchList(results=[])
 
-        # Setup crawler configs
-        browser_conf = BrowserConfig(headless=True)
-        run_conf = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
-
-        async with AsyncWebCrawler(config=browser_conf) as crawler:
-            for item in search_items:
-                url = item.get("href")
-                title = item.get("title")
-                snippet = item.get("body")
-
-                validated_url = self._validate_url(url)
-                if not validated_url:
-                    results.append(
-                        SearchResult(
-                            url=url or "",
-                            title=title,
-                            snippet=snippet,
-                            scraped_content="Invalid URL",
-                        )
-                    )
-                    continue
-
-                try:
-                    crawl_result = await crawler.arun(
-                        url=validated_url,
-                        config=run_conf,
-                        check_robots_txt=False,
-                        only_text=True,
-                        remove_forms=True,
-                        remove_overlay_elements=True,
-                        exclude_external_links=True,
-                        magic=True,
-                        simulate_user=True,
-                    )
-                    if crawl_result.success:
-                        scraped_md = crawl_result.markdown.fit_markdown
-                    else:
-                        scraped_md = f"Crawl failed: {crawl_result.error_message or 'unknown error'}"
-                except Exception as e:
-                    scraped_md = f"Crawl exception: {e}"
-
-                results.append(
-                    SearchResult(
-                        url=validated_url,
-                        title=title,
-                        snippet=snippet,
-                        scraped_content=scraped_md,
-                    )
+        tasks = [
+            asyncio.create_task(self._scrape_item(item, query))
+            for item in search_items
+        ]
+        finished = {}
+        usable_count = 0
+        pending = set(tasks)
+
+        try:
+            while pending and usable_count < self.min_results:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
                 )
+                for task in done:
+                    result, usable = task.result()
+                    finished[task] = (result, usable)
+                    usable_count += usable
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
 
+        # Keep the search engine's ranking, and drop failed pages when any succeeded
+        ranked = [finished[task] for task in tasks if task in finished]
+        results = [result for result, usable in ranked if usable] or [
+            result for result, _ in ranked
+        ]
         return SearchList(results=results)
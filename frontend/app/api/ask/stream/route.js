@@ -20,10 +20,12 @@ export async function POST(request) {
       requestBody.session_id = session_id;
     }
     
+    // Aborting the request cancels the backend stream, which saves the partial answer
     const backendResponse = await fetch(backendUrl, {
       method: 'POST',
       headers,
       body: JSON.stringify(requestBody),
+      signal: request.signal,
     });
     
     if (!backendResponse.ok) {
@@ -4,18 +4,24 @@ import React, { useRef, useEffect } from 'react';
 import ChatMessage from './ChatMessage';
 import ChatForm from './ChatForm';
 
-const ChatContainer = ({ messages = [], isLoading = false, onSubmit, onCancel }) => {
+const ChatContainer = ({ messages = [], hasEarlierMessages = false, onLoadEarlier, isLoading = false, onSubmit, onCancel }) => {
   const messagesRef = useRef(null);
+  const lastMessage = messages[messages.length - 1];
 
-  // Auto-scroll on new messages
+  // Auto-scroll on new messages, but not when earlier ones are prepended
   useEffect(() => {
     const el = messagesRef.current;
     if (el) el.scrollTop = el.scrollHeight;
-  }, [messages]);
+  }, [lastMessage]);
 
   return (
     <div id="chat-container">
       <div id="messages" ref={messagesRef}>
+        {hasEarlierMessages && (
+          <button className="load-more-btn" onClick={onLoadEarlier}>
+            Load earlier messages
+          </button>
+        )}
         {messages.map((msg, index) => (
           <ChatMessage
             key={index}
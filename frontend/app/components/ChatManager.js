@@ -45,17 +45,25 @@ const createLocalChat = () => ({
     id: `chat-${Date.now()}-${Math.random().toString(36).substring(2)}`,
     title: '',
     messages: [],
+    messagesLoaded: true,
+    nextBefore: null,
+    preview: '',
     lastUpdated: new Date().toISOString(),
 });
 
+const isLocalChat = (chatId) => chatId.startsWith('chat-');
+
 // Constants
 const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL;
 const API_ENDPOINTS = {
     CHAT_SESSIONS: `${BACKEND_URL}/chat/sessions`,
     ASK_STREAM: '/api/ask/stream',
-    SAVE_PARTIAL: `${BACKEND_URL}/chat/save_partial`,
 };
 
+// Sessions listed per sidebar page and messages loaded per chat page
+const SESSION_PAGE_SIZE = 20;
+const MESSAGE_PAGE_SIZE = 50;
+
 const MESSAGES = {
     LOADING: 'Loading chat history...',
     NO_CHAT: 'No chat selected',
@@ -71,6 +79,7 @@ const MESSAGES = {
  * Features:
  * - User authentication integration with Keycloak
  * - Persistent chat history stored in MongoDB backend
+ * - Paginated session list; messages are loaded when a chat is opened
  * - Real-time streaming responses
  * - Chat session CRUD operations (create, read, update, delete)
  * - Responsive sidebar with chat list
@@ -80,6 +89,7 @@ const MESSAGES = {
  */
 const ChatManager = () => {
     const [chats, setChats] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [activeChat, setActiveChat, clearActiveChat] = useLocalStorage('dnd-active-chat', null);
     const [sidebarOpen, setSidebarOpen] = useState(true);
     const [loading, setLoading] = useState(true);
@@ -101,15 +111,37 @@ const ChatManager = () => {
     }, []);
 
 
+    // Helper function to format backend messages to frontend format
+    const formatMessages = useCallback((messages) => messages.map(msg => ({
+        content: msg.content,
+        isUser: msg.is_user,
+        timestamp: msg.timestamp
+    })), []);
+
+
     // Helper function to format backend session to frontend format
-    const formatSessionForFrontend = useCallback((session) => ({
+    const formatSessionForFrontend = useCallback((session) => {
+        const messages = formatMessages(session.messages);
+        return {
+            id: session.id,
+            title: session.title || 'New chat',
+            messages,
+            messagesLoaded: true,
+            nextBefore: null,
+            preview: messages.length > 0 ? messages[messages.length - 1].content : '',
+            lastUpdated: session.updated_at,
+        };
+    }, [formatMessages]);
+
+
+    // Helper function to format a backend session summary; messages load on open
+    const formatSessionSummary = useCallback((session) => ({
         id: session.id,
         title: session.title || 'New chat',
-        messages: session.messages.map(msg => ({
-            content: msg.content,
-            isUser: msg.is_user,
-            timestamp: msg.timestamp
-        })),
+        messages: [],
+        messagesLoaded: false,
+        nextBefore: null,
+        preview: session.last_message_preview,
         lastUpdated: session.updated_at,
     }), []);
 
@@ -127,16 +159,17 @@ const ChatManager = () => {
                 return;
             }
 
-            const response = await fetch(API_ENDPOINTS.CHAT_SESSIONS, {
+            const response = await fetch(`${API_ENDPOINTS.CHAT_SESSIONS}?limit=${SESSION_PAGE_SIZE}`, {
                 headers: createAuthHeaders(token),
             });
 
             if (response.ok) {
-                const sessions = await response.json();
+                const { sessions, next_cursor } = await response.json();
                 console.log('Loaded chat sessions:', sessions.length);
                 
-                const formattedChats = sessions.map(formatSessionForFrontend);
+                const formattedChats = sessions.map(formatSessionSummary);
                 setChats(formattedChats);
+                setNextCursor(next_cursor);
                 
                 // Handle active chat selection
                 if (!activeChat && formattedChats.length > 0) {
@@ -161,7 +194,62 @@ const ChatManager = () => {
         } finally {
             setLoading(false);
         }
-    }, [getToken, activeChat, setActiveChat, clearActiveChat, createAuthHeaders, formatSessionForFrontend]);
+    }, [getToken, activeChat, setActiveChat, clearActiveChat, createAuthHeaders, formatSessionSummary]);
+
+
+    // Load the next page of chat sessions
+    const loadMoreSessions = useCallback(async () => {
+        const token = getToken();
+        if (!token || !nextCursor) return;
+
+        try {
+            const params = new URLSearchParams({ limit: SESSION_PAGE_SIZE, cursor: nextCursor });
+            const response = await fetch(`${API_ENDPOINTS.CHAT_SESSIONS}?${params}`, {
+                headers: createAuthHeaders(token),
+            });
+
+            if (response.ok) {
+                const { sessions, next_cursor } = await response.json();
+                setChats(prev => {
+                    const known = new Set(prev.map(chat => chat.id));
+                    return [...prev, ...sessions.filter(s => !known.has(s.id)).map(formatSessionSummary)];
+                });
+                setNextCursor(next_cursor);
+            }
+        } catch (error) {
+            console.error('Failed to load more chat sessions:', error);
+        }
+    }, [getToken, nextCursor, createAuthHeaders, formatSessionSummary]);
+
+
+    // Load a page of a chat's messages; older pages are prepended
+    const loadChatMessages = useCallback(async (chatId, before = null) => {
+        const token = getToken();
+        if (!token || isLocalChat(chatId)) return;
+
+        try {
+            const params = new URLSearchParams({ limit: MESSAGE_PAGE_SIZE });
+            if (before) params.set('before', before);
+            const response = await fetch(`${API_ENDPOINTS.CHAT_SESSIONS}/${chatId}/messages?${params}`, {
+                headers: createAuthHeaders(token),
+            });
+
+            if (response.ok) {
+                const page = await response.json();
+                const messages = formatMessages(page.messages);
+                setChats(prev => prev.map(chat =>
+                    chat.id === chatId ? {
+                        ...chat,
+                        messages: before ? [...messages, ...chat.messages] : messages,
+                        messagesLoaded: true,
+                        nextBefore: page.next_before,
+                    } : chat
+                ));
+            }
+        } catch (error) {
+            console.error('Failed to load chat messages:', error);
+        }
+    }, [getToken, createAuthHeaders, formatMessages]);
 
 
     // Authentication effect
@@ -176,6 +264,16 @@ const ChatManager = () => {
     }, [authenticated, clearActiveChat, loadChatSessions]);
 
 
+    // Load the messages of the active chat the first time it is opened
+    const activeChatData = chats.find(chat => chat.id === activeChat);
+    const activeChatNeedsMessages = activeChatData !== undefined && !activeChatData.messagesLoaded;
+    useEffect(() => {
+        if (activeChatNeedsMessages) {
+            loadChatMessages(activeChat);
+        }
+    }, [activeChat, activeChatNeedsMessages, loadChatMessages]);
+
+
     // Create a new chat session in backend
     const createChatSession = useCallback(async (title = 'New chat') => {
         try {
@@ -329,6 +427,7 @@ const ChatManager = () => {
             chat.id === chatId ? {
                 ...chat,
                 messages: [...chat.messages, ...newMessages],
+                preview: newMessages.find(msg => msg.isUser)?.content || chat.preview,
                 lastUpdated: new Date().toISOString(),
                 title: (() => {
                     if (updateTitle && (!chat.title || chat.title === '' || chat.title === 'New chat')) {
@@ -400,38 +499,15 @@ const ChatManager = () => {
     }, [setLoadingForChat]);
 
 
-    const handleAbortStream = useCallback(async (chatId) => {
+    // The backend saves the partial response when the stream is cancelled
+    const handleAbortStream = useCallback((chatId) => {
         const abortController = activeStreamsRef.current.get(chatId);
         if (abortController) {
-            // Find the current partial response before aborting
-            const chat = chats.find(c => c.id === chatId);
-            if (chat && chat.messages.length > 0) {
-                const lastMessage = chat.messages[chat.messages.length - 1];
-                // Only save if it's a non-user message and has content
-                if (!lastMessage.isUser && lastMessage.content && lastMessage.content !== MESSAGES.CHECKING) {
-                    try {
-                        const token = getToken();
-                        if (token) {
-                            await fetch(API_ENDPOINTS.SAVE_PARTIAL, {
-                                method: 'POST',
-                                headers: createAuthHeaders(token),
-                                body: JSON.stringify({
-                                    session_id: chatId,
-                                    partial_response: lastMessage.content
-                            }),
-                        });
-                        }
-                    } catch (error) {
-                        console.error('Failed to save partial response:', error);
-                    }
-                }
-            }
-            
             abortController.abort();
             activeStreamsRef.current.delete(chatId);
             setLoadingForChat(chatId, false);
         }
-    }, [chats, getToken, createAuthHeaders, setLoadingForChat]);
+    }, [setLoadingForChat]);
 
 
     const streamResponse = useCallback(async (chatId, question) => {
@@ -522,6 +598,8 @@ const ChatManager = () => {
                         onDeleteChat={handleDeleteChat}
                         onEditTitle={handleEditTitle}
                         isStreamActive={isAnyStreamActive}
+                        hasMore={nextCursor !== null}
+                        onLoadMore={loadMoreSessions}
                     />
                 )}
 
@@ -534,6 +612,8 @@ const ChatManager = () => {
                         <ChatContainer
                             key={currentChat.id}
                             messages={currentChat.messages}
+                            hasEarlierMessages={currentChat.nextBefore !== null}
+                            onLoadEarlier={() => loadChatMessages(currentChat.id, currentChat.nextBefore)}
                             isLoading={isCurrentChatLoading}
                             onSubmit={(question) => streamResponse(currentChat.id, question)}
                             onCancel={() => handleAbortStream(currentChat.id)}
@@ -3,7 +3,7 @@
 import React, { useState } from 'react';
 import { useKeycloak } from '../contexts/KeycloakContext';
 
-const ChatSidebar = ({ chats, activeChat, onChatSelect, onNewChat, onDeleteChat, onEditTitle, isStreamActive }) => {
+const ChatSidebar = ({ chats, activeChat, onChatSelect, onNewChat, onDeleteChat, onEditTitle, isStreamActive, hasMore, onLoadMore }) => {
   const { userInfo, logout } = useKeycloak();
   const [editingChatId, setEditingChatId] = useState(null);
   const [editingTitle, setEditingTitle] = useState('');
@@ -92,8 +92,8 @@ const ChatSidebar = ({ chats, activeChat, onChatSelect, onNewChat, onDeleteChat,
                 )}
               </div>
               <div className="chat-preview">
-                {chat.messages.length > 0 
-                  ? chat.messages[0].content.slice(0, 100) + '...'
+                {chat.preview
+                  ? chat.preview.slice(0, 100) + '...'
                   : 'New conversation'
                 }
               </div>
@@ -116,6 +116,11 @@ const ChatSidebar = ({ chats, activeChat, onChatSelect, onNewChat, onDeleteChat,
             </button>
           </div>
         ))}
+        {hasMore && (
+          <button className="load-more-btn" onClick={onLoadMore}>
+            Load more
+          </button>
+        )}
       </div>
     </div>
   );
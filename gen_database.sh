@@ -7,31 +7,84 @@ CLIENT_ID="dnd-rag-backend"
 CLIENT_SECRET=${KEYCLOAK_CLIENT_SECRET}
 USERNAME="dnd_admin"
 PASSWORD="dnd_admin"
+# Consecutive failed status requests before giving up on polling
+MAX_POLL_ERRORS=12
 
-# Get access token
-TOKEN_RESPONSE=$(curl -s -X POST \
-  "${KEYCLOAK_URL}/realms/${REALM}/protocol/openid-connect/token" \
-  -H "Content-Type: application/x-www-form-urlencoded" \
-  -d "grant_type=password" \
-  -d "client_id=${CLIENT_ID}" \
-  -d "client_secret=${CLIENT_SECRET}" \
-  -d "username=${USERNAME}" \
-  -d "password=${PASSWORD}")
-
-# Extract access token
-ACCESS_TOKEN=$(echo $TOKEN_RESPONSE | jq -r '.access_token')
-
-if [ "$ACCESS_TOKEN" = "null" ]; then
-  echo "Failed to get access token:"
-  echo $TOKEN_RESPONSE
-  exit 1
-fi
+# Get an access token; long jobs outlive it, so polling fetches new ones
+get_token() {
+  TOKEN_RESPONSE=$(curl -s -X POST \
+    "${KEYCLOAK_URL}/realms/${REALM}/protocol/openid-connect/token" \
+    -H "Content-Type: application/x-www-form-urlencoded" \
+    -d "grant_type=password" \
+    -d "client_id=${CLIENT_ID}" \
+    -d "client_secret=${CLIENT_SECRET}" \
+    -d "username=${USERNAME}" \
+    -d "password=${PASSWORD}")
+
+  # Extract access token
+  ACCESS_TOKEN=$(echo $TOKEN_RESPONSE | jq -r '.access_token')
+
+  if [ "$ACCESS_TOKEN" = "null" ] || [ -z "$ACCESS_TOKEN" ]; then
+    echo "Failed to get access token:"
+    echo $TOKEN_RESPONSE
+    return 1
+  fi
+}
+
+get_token || exit 1
 
 echo "Access Token obtained successfully!"
 echo "TOKEN: $ACCESS_TOKEN"
 
 # Now call the generate database endpoint
 echo "Calling generate database endpoint..."
-curl -X POST http://localhost:8000/generate_database \
+JOB_RESPONSE=$(curl -s -X POST http://localhost:8000/generate_database \
   -H "Authorization: Bearer $ACCESS_TOKEN" \
-  -H "Content-Type: application/json"
+  -H "Content-Type: application/json")
+
+JOB_ID=$(echo $JOB_RESPONSE | jq -r '.id')
+
+if [ "$JOB_ID" = "null" ]; then
+  echo "Failed to start database generation:"
+  echo $JOB_RESPONSE
+  exit 1
+fi
+
+echo "Database generation started (job $JOB_ID)"
+
+# Poll the job until it finishes
+POLL_ERRORS=0
+while true; do
+  RESPONSE=$(curl -s -w '\n%{http_code}' http://localhost:8000/generate_database/${JOB_ID} \
+    -H "Authorization: Bearer $ACCESS_TOKEN")
+  HTTP_CODE=$(echo "$RESPONSE" | tail -n 1)
+  JOB_STATUS=$(echo "$RESPONSE" | sed '$d')
+
+  # Only a job status is a final state, errors are retried
+  if [ "$HTTP_CODE" != "200" ]; then
+    POLL_ERRORS=$((POLL_ERRORS + 1))
+    echo "Status request failed with HTTP $HTTP_CODE ($POLL_ERRORS/$MAX_POLL_ERRORS): $JOB_STATUS"
+    if [ "$POLL_ERRORS" -ge "$MAX_POLL_ERRORS" ]; then
+      echo "Giving up; the job may still be running"
+      exit 1
+    fi
+    if [ "$HTTP_CODE" = "401" ]; then
+      # The access token expired
+      get_token && continue
+    fi
+    sleep 5
+    continue
+  fi
+  POLL_ERRORS=0
+
+  STATUS=$(echo $JOB_STATUS | jq -r '.status')
+  echo "$(echo $JOB_STATUS | jq -c '{status, phase, collection, pages_converted, chunks_embedded, points_upserted, points_copied}')"
+
+  if [ "$STATUS" != "running" ] && [ "$STATUS" != "queued" ] && [ "$STATUS" != "cancelling" ]; then
+    echo $JOB_STATUS
+    break
+  fi
+  sleep 5
+done
+
+[ "$STATUS" = "completed" ]